@@ -0,0 +1,24 @@
+# ../benchmarks/__init__.py
+
+"""Benchmarks for the plugin helper packages.
+
+Run each benchmark from the repository root as a module, for example::
+
+    python -m benchmarks.release_archive
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import sys
+from pathlib import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Make the helper packages importable the same way the entry points do
+PACKAGES_DIR = Path(__file__).resolve().parent.parent / "packages"
+if str(PACKAGES_DIR) not in sys.path:
+    sys.path.insert(0, str(PACKAGES_DIR))
@@ -0,0 +1,150 @@
+# ../benchmarks/farm.py
+
+"""Generates a farm of synthetic plugin git repositories.
+
+Every plugin gets an info.ini, a Python package and the requested number of
+files spread across the ALLOWED_FILETYPES directories with their allowed
+extensions.  The contents are generated from a seed, so the same arguments
+always produce the same farm.
+
+The helper configuration must be in the environment before this module is
+imported, as the allowed file types are read from common.constants.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from subprocess import run
+
+# Package
+from common.constants import ALLOWED_FILETYPES, PLUGIN_BASE_PATH
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the extensions that are generated as readable text
+_text_extensions = {
+    "cfg", "ini", "json", "md", "py", "txt", "vdf", "vmt", "xml",
+}
+
+# Store the git options that make the farm's commits reproducible
+_git_config = [
+    "-c", "user.name=benchmark",
+    "-c", "user.email=benchmark@localhost",
+    "-c", "commit.gpgsign=false",
+]
+_git_environment = {
+    "GIT_AUTHOR_DATE": "2000-01-01T00:00:00+0000",
+    "GIT_COMMITTER_DATE": "2000-01-01T00:00:00+0000",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def create_farm(start_dir, plugin_count, file_count, asset_size, seed=0):
+    """Create plugin_count plugin repositories and return their names."""
+    random = Random(seed)
+    plugin_names = []
+    for number in range(plugin_count):
+        plugin_name = f"farm_{number}"
+        create_plugin_repository(
+            Path(start_dir) / plugin_name, plugin_name, file_count,
+            asset_size, random,
+        )
+        plugin_names.append(plugin_name)
+    return plugin_names
+
+
+def create_plugin_repository(
+    repo_path, plugin_name, file_count, asset_size, random,
+):
+    """Create one synthetic plugin repository with a single commit."""
+    plugin_path = repo_path / PLUGIN_BASE_PATH / plugin_name
+    plugin_path.mkdir(parents=True)
+    (plugin_path / "info.ini").write_text(
+        f'version = "1.0.0"\nname = "{plugin_name}"\n',
+    )
+    (plugin_path / "__init__.py").write_text(
+        f'"""The {plugin_name} plugin."""\n',
+    )
+
+    slots = [
+        (base_path, extension)
+        for base_path, extensions in sorted(ALLOWED_FILETYPES.items())
+        for extension in extensions
+    ]
+    for number in range(file_count):
+        base_path, extension = slots[number % len(slots)]
+        directory = repo_path / base_path / plugin_name
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file_{number}.{extension}").write_bytes(
+            _get_contents(number, extension, asset_size, random),
+        )
+
+    for args in (
+        ["init", "-q"],
+        ["add", "-A"],
+        ["commit", "-q", "-m", "Initial commit"],
+    ):
+        run(
+            ["git", *_git_config, "-C", str(repo_path), *args],
+            env={**os.environ, **_git_environment},
+            check=True,
+        )
+
+
+def main():
+    """Generate a plugin farm in the given directory."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="The directory to create it in.")
+    parser.add_argument(
+        "--plugins", type=int, default=10,
+        help="The number of plugins to create.",
+    )
+    parser.add_argument(
+        "--files", type=int, default=100,
+        help="The number of files in each plugin.",
+    )
+    parser.add_argument(
+        "--asset-size", type=int, default=4096,
+        help="The size of each non-Python file in bytes.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="The seed the file contents are generated from.",
+    )
+    args = parser.parse_args()
+    plugin_names = create_farm(
+        args.directory, args.plugins, args.files, args.asset_size, args.seed,
+    )
+    print(f'Created {len(plugin_names)} plugins in "{args.directory}".')
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_contents(number, extension, asset_size, random):
+    """Return the generated contents of a file."""
+    if extension == "py":
+        return f"VALUE_{number} = {number}\n".encode()
+
+    if extension in _text_extensions:
+        line = f"value_{number} = {random.random()}\n".encode()
+        return (line * (asset_size // len(line) + 1))[:asset_size]
+
+    return random.randbytes(asset_size)
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    main()
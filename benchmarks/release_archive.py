@@ -0,0 +1,145 @@
+# ../benchmarks/release_archive.py
+
+"""Benchmarks building a release archive for a synthetic repository.
+
+The builder is timed with one thread and with the requested number of
+compression threads, and both archives are compared byte for byte.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from zipfile import ZIP_DEFLATED, ZipFile
+
+# Package
+from common.archive import COMPRESSION_TYPES, CompressionPolicy, ReleaseArchive
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Asset directories the synthetic files are spread across
+_asset_directories = (
+    "materials/{plugin}/{group}",
+    "models/{plugin}/{group}",
+    "sound/source-python/{plugin}/{group}",
+    "addons/source-python/plugins/{plugin}/{group}",
+)
+
+_files_per_directory = 50
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def create_repository(base_path, file_count, file_size=1, plugin="benchmark"):
+    """Create file_count text files and return their relative paths."""
+    files = []
+    for number in range(file_count):
+        directory = _asset_directories[number % len(_asset_directories)]
+        group = number // (_files_per_directory * len(_asset_directories))
+        relative = directory.format(plugin=plugin, group=group)
+        (base_path / relative).mkdir(parents=True, exist_ok=True)
+        file = f"{relative}/file_{number}.txt"
+        line = f"value_{number} = {number}\n".encode()
+        (base_path / file).write_bytes(
+            (line * (file_size // len(line) + 1))[:file_size],
+        )
+        files.append(file)
+    return files
+
+
+def legacy_build(zip_path, base_path, files):
+    """Build the archive the way PluginReleaser.add_file used to."""
+    with ZipFile(zip_path, "w", ZIP_DEFLATED) as zip_file:
+        for file in files:
+            zip_file.write(base_path / file, file)
+            directory = (base_path / file).parent
+            while directory != base_path:
+                current = directory.relative_to(base_path).as_posix() + "/"
+                if current not in zip_file.namelist():
+                    zip_file.write(directory, current)
+                directory = directory.parent
+
+
+def time_build(function, *args):
+    """Return the number of seconds the given build took."""
+    start = perf_counter()
+    function(*args)
+    return perf_counter() - start
+
+
+def main():
+    """Time the archive builders for each requested file count."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--files", type=int, nargs="+", default=[1000, 5000, 50000],
+        help="The file counts to benchmark.",
+    )
+    parser.add_argument(
+        "--file-size", type=int, default=1,
+        help="The size of each file in bytes.",
+    )
+    parser.add_argument(
+        "--legacy-limit", type=int, default=5000,
+        help="The largest file count to also time the legacy builder with.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="The number of threads the threaded builder compresses in.",
+    )
+    parser.add_argument(
+        "--compression", choices=sorted(COMPRESSION_TYPES), default="deflated",
+        help="The compression the builders use.",
+    )
+    args = parser.parse_args()
+    policy = CompressionPolicy(args.compression)
+
+    print(
+        f"{'Files':>8}  {'Legacy (s)':>10}  {'Builder (s)':>11}  "
+        f"{'Threaded (s)':>12}  Identical",
+    )
+    for file_count in args.files:
+        with TemporaryDirectory() as directory:
+            base_path = Path(directory) / "repository"
+            files = create_repository(base_path, file_count, args.file_size)
+
+            legacy = "skipped"
+            if file_count <= args.legacy_limit:
+                legacy = time_build(
+                    legacy_build, Path(directory) / "legacy.zip",
+                    base_path, files,
+                )
+                legacy = f"{legacy:.2f}"
+
+            zip_path = Path(directory) / "release.zip"
+            builder = time_build(
+                ReleaseArchive(zip_path, base_path, policy=policy).build,
+                files,
+            )
+            threaded_path = Path(directory) / "threaded.zip"
+            threaded = time_build(
+                ReleaseArchive(
+                    threaded_path, base_path, policy=policy,
+                    workers=args.workers,
+                ).build,
+                files,
+            )
+            identical = zip_path.read_bytes() == threaded_path.read_bytes()
+            print(
+                f"{file_count:>8}  {legacy:>10}  {builder:>11.2f}  "
+                f"{threaded:>12.2f}  {'yes' if identical else 'NO'}",
+            )
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    main()
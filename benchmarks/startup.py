@@ -0,0 +1,166 @@
+# ../benchmarks/startup.py
+
+"""Checks the import time of each entry point against a time budget.
+
+Each entry point is imported in a fresh interpreter with "-X importtime",
+and the benchmark exits with a non-zero code if any of them exceeds its
+budget.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import os
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from subprocess import run
+from tempfile import TemporaryDirectory
+
+# Package
+from benchmarks import PACKAGES_DIR
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the import time budget of each entry point in milliseconds
+DEFAULT_BUDGETS = {
+    "link_verifier": 80,
+    "plugin_backfiller": 100,
+    "plugin_checker": 80,
+    "plugin_creator": 80,
+    "plugin_linker": 80,
+    "plugin_releaser": 100,
+    "plugin_status": 80,
+    "plugin_watcher": 80,
+    "sp_linker": 80,
+}
+
+# Store the configuration values the entry points need at import time
+_environment = {
+    "PLUGIN_BASE_PATH": "addons/source-python/plugins",
+    "CONFIG_BASE_PATH": "cfg/source-python",
+    "DATA_BASE_PATH": "addons/source-python/data/plugins",
+    "DOCS_BASE_PATH": "addons/source-python/docs/plugins",
+    "EVENTS_BASE_PATH": "resource/source-python/events",
+    "LOGS_BASE_PATH": "logs/source-python",
+    "SOUND_BASE_PATH": "sound/source-python",
+    "TRANSLATIONS_BASE_PATH": "resource/source-python/translations",
+    "AUTHOR": "benchmark",
+}
+
+_directories = {
+    "STARTDIR": "plugins",
+    "PLUGIN_PRIMARY_FILES_DIR": "primary",
+    "PLUGIN_ROOT_FILES_DIR": "root",
+    "LINK_BASE_DIRECTORY": "link",
+    "RELEASE_DIRECTORY": "releases",
+    "SERVER_DIRECTORIES": "servers",
+}
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_environment(base_path):
+    """Return an environment with every directory setting under base_path."""
+    environment = {**os.environ, **_environment}
+    for name, directory in _directories.items():
+        path = base_path / directory
+        path.mkdir(exist_ok=True)
+        environment[name] = str(path)
+    return environment
+
+
+def parse_import_times(output):
+    """Return the cumulative import time of each module in microseconds.
+
+    Only the last occurrence of each module is kept, so the entry point's
+    value includes everything that importing it pulled in.
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(entry_point, environment, repeat):
+    """Return the best import time of the entry point and its import times."""
+    best = None
+    for _ in range(repeat):
+        result = run(
+            [sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+            cwd=PACKAGES_DIR,
+            env=environment,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode:
+            msg = f"Importing {entry_point} failed:\n{result.stderr}"
+            raise RuntimeError(msg)
+
+        times = parse_import_times(result.stderr)
+        if best is None or times[entry_point] < best[entry_point]:
+            best = times
+    return best
+
+
+def main():
+    """Measure each entry point and fail if any exceeds its budget."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget", action="append", default=[], metavar="NAME=MS",
+        help="Override the budget of an entry point in milliseconds.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="The number of times to import each entry point.",
+    )
+    parser.add_argument(
+        "--top", type=int, default=5,
+        help="The number of slowest imports to show for each entry point.",
+    )
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in args.budget:
+        name, _, milliseconds = value.partition("=")
+        budgets[name] = float(milliseconds)
+
+    failed = []
+    with TemporaryDirectory() as directory:
+        environment = get_environment(Path(directory))
+        for entry_point, budget in budgets.items():
+            times = measure(entry_point, environment, args.repeat)
+            total = times[entry_point] / 1000
+            status = "OK" if total <= budget else "OVER BUDGET"
+            if total > budget:
+                failed.append(entry_point)
+
+            print(f"{entry_point}: {total:.1f}ms / {budget}ms {status}")
+            slowest = sorted(
+                (item for item in times.items() if item[0] != entry_point),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+            for name, microseconds in slowest[:args.top]:
+                print(f"\t{microseconds / 1000:>7.1f}ms  {name}")
+
+    if failed:
+        print(f"\nOver budget: {', '.join(failed)}")
+        sys.exit(1)
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+# ../benchmarks/suite.py
+
+"""Times the helpers against a synthetic plugin farm.
+
+A farm of plugin git repositories is generated in a temporary directory and
+every helper is run against it with its output hidden.  The best time of
+each benchmark can be saved as JSON and compared against a stored baseline,
+in which case the suite exits with a non-zero code if any benchmark became
+slower than the allowed threshold.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import json
+import os
+import platform
+import sys
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from shutil import rmtree, which
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+# Package
+from benchmarks.startup import get_environment
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the plugin templates the creator renders
+_primary_files = {
+    "__init__.py": '"""{{ plugin_name }} by {{ author }}."""\n',
+    "info.ini": 'version = "0.0.0"\nauthor = "{{ author }}"\n',
+}
+_root_files = {
+    "LICENSE": "Benchmark license\n",
+}
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def measure(function, repeat, setup=None):
+    """Return the best time in seconds of calling the function.
+
+    setup is called before each call, outside of the timing, and its
+    return value is passed to the function.
+    """
+    best = None
+    for _ in range(repeat):
+        with redirect_stdout(StringIO()):
+            value = None if setup is None else setup()
+            start = perf_counter()
+            function(value)
+            seconds = perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run_suite(base_path, args):
+    """Generate the farm, run every benchmark and return their times."""
+    # Import the helpers only now, as they read the environment on import
+    import plugin_checker
+    import plugin_creator
+    import plugin_linker
+    from common import functions
+    from common.constants import CACHE_DIR, LINK_BASE_DIRECTORY
+    from common.links import link_manifest
+    from common.servers import supported_games
+
+    from benchmarks.farm import create_farm
+
+    plugin_names = create_farm(
+        base_path / "plugins", args.plugins, args.files, args.asset_size,
+        args.seed,
+    )
+    results = {}
+
+    def _reset_links():
+        for path in (LINK_BASE_DIRECTORY, CACHE_DIR / "links.json"):
+            if path.is_dir():
+                rmtree(path)
+                path.mkdir()
+            elif path.is_file():
+                path.unlink()
+        link_manifest.reload()
+
+    # Time creating as many new plugins as the farm has
+    created = [f"created_{number}" for number in range(args.plugins)]
+
+    def _remove_created():
+        for plugin_name in created:
+            rmtree(base_path / "plugins" / plugin_name, ignore_errors=True)
+
+    results["create_plugin"] = measure(
+        lambda _: [
+            plugin_creator.create_plugin(
+                plugin_name, config=True, data="directory", docs=False,
+                events=False, logs=False, sound=True, translations="file",
+            )
+            for plugin_name in created
+        ],
+        args.repeat,
+        _remove_created,
+    )
+    _remove_created()
+
+    # Time linking every plugin, then linking them again unchanged
+    results["link_plugin"] = measure(
+        lambda _: plugin_linker.link_plugins(plugin_names),
+        args.repeat,
+        _reset_links,
+    )
+    results["link_plugin_unchanged"] = measure(
+        lambda _: plugin_linker.link_plugins(plugin_names), args.repeat,
+    )
+
+    # Time checking every plugin with and without the result cache
+    if which("ruff") is not None:
+        results["check_plugin"] = measure(
+            lambda _: plugin_checker.check_plugins(
+                plugin_names, use_cache=False,
+            ),
+            args.repeat,
+        )
+        results["check_plugin_cached"] = measure(
+            lambda _: plugin_checker.check_plugins(plugin_names),
+            args.repeat,
+            lambda: plugin_checker.check_plugins(plugin_names),
+        )
+    else:
+        print("Skipping check_plugin, ruff is not installed.")
+
+    results.update(_time_releases(plugin_names, args.repeat))
+
+    # Time linking Source.Python to every server
+    game_names = _create_source_python(args.games)
+
+    def _reset_servers():
+        (CACHE_DIR / "links.json").remove_p()
+        link_manifest.reload()
+        for game_name in game_names:
+            server = supported_games[game_name]["directory"]
+            rmtree(server, ignore_errors=True)
+            server.mkdir()
+
+    def _link_servers():
+        bin_cache = functions.prepare_bin_cache()
+        return [
+            functions.link_source_python(game_name, bin_cache)
+            for game_name in game_names
+        ]
+
+    results["link_source_python"] = measure(
+        lambda _: _link_servers(),
+        args.repeat,
+        _reset_servers,
+    )
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Print the results against the baseline and return the regressions.
+
+    A benchmark only regressed if it became slower by more than the
+    threshold and by more than min_seconds, so noise in very short
+    benchmarks is not reported.
+    """
+    regressions = []
+    width = max(len("Benchmark"), *map(len, results))
+    print(f"{'Benchmark':<{width}}  {'Best (s)':>9}  {'Baseline':>9}  Change")
+    print(f"{'-' * width}  {'-' * 9}  {'-' * 9}  ------")
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<{width}}  {seconds:>9.3f}  {'-':>9}")
+            continue
+
+        change = seconds / previous - 1 if previous else 0
+        flag = ""
+        if change > threshold and seconds - previous > min_seconds:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<{width}}  {seconds:>9.3f}  {previous:>9.3f}  "
+            f"{change:+.0%}{flag}",
+        )
+    return regressions
+
+
+def main():
+    """Run the suite and compare it against the baseline if one is given."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--plugins", type=int, default=20,
+        help="The number of plugins in the farm.",
+    )
+    parser.add_argument(
+        "--files", type=int, default=200,
+        help="The number of files in each plugin.",
+    )
+    parser.add_argument(
+        "--asset-size", type=int, default=4096,
+        help="The size of each non-Python file in bytes.",
+    )
+    parser.add_argument(
+        "--games", type=int, default=4,
+        help="The number of servers to link Source.Python to.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="The seed the farm's file contents are generated from.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="The number of times to run each benchmark.",
+    )
+    parser.add_argument(
+        "--output", type=Path,
+        help="Save the results as JSON to the given file.",
+    )
+    parser.add_argument(
+        "--baseline", type=Path,
+        help="Compare the results against the given saved results.",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="The slowdown over the baseline that counts as a regression.",
+    )
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.01,
+        help="The smallest slowdown in seconds that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        base_path = Path(directory)
+        os.environ.update(get_environment(base_path))
+        for name, files in (
+            ("primary", _primary_files),
+            ("root", _root_files),
+        ):
+            for file_name, contents in files.items():
+                (base_path / name / file_name).write_text(contents)
+
+        results = run_suite(base_path, args)
+
+    data = {
+        "settings": {
+            "plugins": args.plugins,
+            "files": args.files,
+            "asset_size": args.asset_size,
+            "games": args.games,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(data, indent=2))
+
+    baseline = {}
+    if args.baseline is not None:
+        baseline_data = json.loads(args.baseline.read_text())
+        if baseline_data.get("settings") != data["settings"]:
+            print("Warning: the baseline was run with different settings.\n")
+        baseline = baseline_data["results"]
+
+    regressions = compare(
+        results, baseline, args.threshold, args.min_seconds,
+    )
+    if regressions:
+        print(f"\nRegressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _time_releases(plugin_names, repeat):
+    """Return the times of creating the release of every plugin.
+
+    The releases are timed from scratch, again while unchanged, and built
+    from the git objects of HEAD.
+    """
+    import plugin_releaser
+    from common.constants import RELEASE_DIR
+
+    def _prepare_releases(*, clear=True, ref=None):
+        if clear:
+            rmtree(RELEASE_DIR)
+            RELEASE_DIR.mkdir()
+        releasers = []
+        for plugin_name in plugin_names:
+            releaser = plugin_releaser.PluginReleaser(plugin_name, ref)
+            if ref is None:
+                releaser.validate_diff()
+            else:
+                releaser.validate_ref()
+            releaser.validate_version_exists()
+            releasers.append(releaser)
+        return releasers
+
+    def _create_releases(releasers):
+        for releaser in releasers:
+            releaser.create_release()
+
+    return {
+        "create_release": measure(
+            _create_releases, repeat, _prepare_releases,
+        ),
+        "create_release_unchanged": measure(
+            _create_releases, repeat, lambda: _prepare_releases(clear=False),
+        ),
+        "create_release_from_ref": measure(
+            _create_releases, repeat, lambda: _prepare_releases(ref="HEAD"),
+        ),
+    }
+
+
+def _create_source_python(server_count):
+    """Create a fake Source.Python checkout and servers to link it to.
+
+    Each server is named after one of the support file's [servers]
+    entries, so the helpers find it the same way they find real servers.
+    Returns the names of the servers.
+    """
+    from common.constants import (
+        CORE_BINARY,
+        PLATFORM,
+        SERVER_DIRECTORIES,
+        SOURCE_BINARY,
+        SOURCE_PYTHON_ADDONS_DIR,
+        SOURCE_PYTHON_BUILDS_DIR,
+        SOURCE_PYTHON_DIR,
+        SUPPORT_FILE,
+        source_python_addons_directories,
+        source_python_directories,
+    )
+    from common.servers import supported_games
+    from configobj import ConfigObj
+
+    for directory in source_python_directories:
+        SOURCE_PYTHON_DIR.joinpath(directory, "source-python").makedirs_p()
+    for directory in (*source_python_addons_directories, "bin"):
+        SOURCE_PYTHON_ADDONS_DIR.joinpath(directory).makedirs_p()
+        SOURCE_PYTHON_ADDONS_DIR.joinpath(directory, "file.txt").write_text(
+            directory,
+        )
+    SOURCE_PYTHON_DIR.joinpath("addons", "source-python.vdf").write_text("")
+
+    servers = ConfigObj(SUPPORT_FILE)["servers"]
+    for server_name, values in list(servers.items())[:server_count]:
+        server = SERVER_DIRECTORIES[0] / server_name / values["folder"]
+        server.makedirs_p()
+        build_dir = SOURCE_PYTHON_BUILDS_DIR / values["branch"]
+        if PLATFORM == "windows":
+            build_dir = build_dir / "Release"
+        build_dir.makedirs_p()
+        for binary in (SOURCE_BINARY, CORE_BINARY):
+            (build_dir / binary).write_bytes(b"\0" * 1024)
+
+    supported_games.reload()
+    return list(supported_games)
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    main()
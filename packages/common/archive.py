@@ -0,0 +1,527 @@
+# ../common/archive.py
+
+"""Provides the archive builder used to create plugin releases."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import bz2
+import lzma
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from hashlib import sha256
+from struct import pack, unpack
+from time import perf_counter
+from warnings import warn
+from zipfile import (
+    ZIP_BZIP2,
+    ZIP_DEFLATED,
+    ZIP_LZMA,
+    ZIP_STORED,
+    ZipFile,
+    ZipInfo,
+)
+from zlib import Z_BEST_COMPRESSION, crc32
+
+# Package
+from common import profiling
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Local file header layout, see section 4.3.7 of the zip APPNOTE
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_LOCAL_HEADER_SIZE = 30
+_ENCRYPTED_FLAG = 0x01
+_DATA_DESCRIPTOR_FLAG = 0x08
+_LZMA_END_MARKER_FLAG = 0x02
+
+# Store the fixed metadata every entry gets so that identical files always
+#   produce identical archives, whatever system and checkout they come from
+_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_ENTRY_CREATE_SYSTEM = 3
+_FILE_ATTRIBUTES = 0o100644 << 16
+_DIRECTORY_ATTRIBUTES = (0o040755 << 16) | 0x10
+
+# Increase this whenever a change to the builder changes the archives it
+#   creates, so existing release digests no longer match
+ARCHIVE_FORMAT_VERSION = 1
+
+# Store the LZMA settings zip entries use, which are the default preset's,
+#   and the properties header each entry's data starts with, see section
+#   5.8.8 of the zip APPNOTE
+_LZMA_FILTER = {
+    "id": lzma.FILTER_LZMA1,
+    "dict_size": 1 << 23,
+    "lc": 3,
+    "lp": 0,
+    "pb": 2,
+}
+_LZMA_PROPERTIES = bytes([
+    (_LZMA_FILTER["pb"] * 5 + _LZMA_FILTER["lp"]) * 9 + _LZMA_FILTER["lc"],
+]) + pack("<I", _LZMA_FILTER["dict_size"])
+_LZMA_HEADER = pack("<BBH", 9, 4, len(_LZMA_PROPERTIES)) + _LZMA_PROPERTIES
+
+# Store the size below which files are compressed on the writing thread,
+#   as handing them to a worker would take longer than compressing them
+_THREAD_MIN_SIZE = 64 * 1024
+
+COMPRESSION_TYPES = {
+    "bzip2": ZIP_BZIP2,
+    "deflated": ZIP_DEFLATED,
+    "lzma": ZIP_LZMA,
+}
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_directory_entries(files):
+    """Return every parent directory entry of the given files, sorted.
+
+    Each directory is visited only once, so this scales linearly with the
+    number of files regardless of how many of them share a directory.
+    """
+    directories = set()
+    for file in files:
+        name = file.replace("\\", "/")
+        index = name.rfind("/")
+        while index > 0:
+            directory = name[:index + 1]
+
+            # Have this directory and all its parents already been found?
+            if directory in directories:
+                break
+
+            directories.add(directory)
+            index = name.rfind("/", 0, index)
+
+    return sorted(directories)
+
+
+def get_entry_info(name):
+    """Return the ZipInfo of the given entry with normalized metadata.
+
+    Names ending with "/" are directories.  Every entry gets the same
+    timestamp, creator system and permissions.
+    """
+    zinfo = ZipInfo(name, _ENTRY_DATE_TIME)
+    zinfo.create_system = _ENTRY_CREATE_SYSTEM
+    zinfo.external_attr = (
+        _DIRECTORY_ATTRIBUTES if name.endswith("/") else _FILE_ATTRIBUTES
+    )
+    return zinfo
+
+
+def get_release_digest(files, blob_ids, policy):
+    """Return the digest of a release's inputs.
+
+    blob_ids maps each file to the git object id of its content.  The
+    digest covers the archive format, the compression policy and every
+    file with its content, so two releases with the same digest hold the
+    same files compressed with the same settings.
+    """
+    digest = sha256(
+        f"{ARCHIVE_FORMAT_VERSION}\0{policy.signature}\0".encode(),
+    )
+    for file in sorted(files):
+        digest.update(f"{blob_ids[file]} {file}\0".encode())
+    return digest.hexdigest()
+
+
+def read_raw_entry(zip_file, zinfo):
+    """Return the still compressed bytes of the given member."""
+    zip_file.fp.seek(zinfo.header_offset)
+    header = zip_file.fp.read(_LOCAL_HEADER_SIZE)
+    if header[:4] != _LOCAL_HEADER_SIGNATURE:
+        msg = f'Bad local file header for "{zinfo.filename}".'
+        raise ValueError(msg)
+
+    name_length, extra_length = unpack("<HH", header[26:30])
+    zip_file.fp.seek(
+        zinfo.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length,
+    )
+    return zip_file.fp.read(zinfo.compress_size)
+
+
+def write_raw_entry(zip_file, zinfo, data):
+    """Write already compressed data for the given member to the zip.
+
+    zinfo must already hold the compression type, CRC and both sizes that
+    belong to data.  zipfile has no public API for this, so this mirrors
+    what ZipFile.write does once it has compressed a member.
+    """
+    zip_file._writecheck(zinfo)  # noqa: SLF001
+    zinfo.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    zinfo.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zinfo.FileHeader(None))
+    zip_file.fp.write(data)
+    zip_file.start_dir = zip_file.fp.tell()
+    zip_file.filelist.append(zinfo)
+    zip_file.NameToInfo[zinfo.filename] = zinfo
+    zip_file._didModify = True  # noqa: SLF001
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class CompressionPolicy:
+    """Decides how each file in a release archive gets compressed.
+
+    Files are matched by extension against three rules: "stored" files are
+    not compressed at all, "maximum" files use the highest compression
+    level, and everything else uses the archive's default compression.
+    """
+
+    def __init__(self, compression="deflated", stored=(), maximum=()):
+        """Store the archive compression and the per-extension rules."""
+        if compression not in COMPRESSION_TYPES:
+            warn(
+                f'Invalid release compression "{compression}".  '
+                f'Using "deflated" instead.',
+            )
+            compression = "deflated"
+
+        self.compression_name = compression
+        self.compression = COMPRESSION_TYPES[compression]
+        self.extensions = {
+            **{extension.lower(): "maximum" for extension in maximum},
+            **{extension.lower(): "stored" for extension in stored},
+        }
+        self.rules = {
+            "default": (self.compression, None),
+            "maximum": (
+                self.compression,
+                Z_BEST_COMPRESSION if self.compression == ZIP_DEFLATED
+                else None,
+            ),
+            "stored": (ZIP_STORED, None),
+        }
+
+    @property
+    def signature(self):
+        """Return a string that changes whenever the policy's output does."""
+        return f"{self.compression}:{sorted(self.extensions.items())}"
+
+    @classmethod
+    def from_data(cls, data):
+        """Return the policy the given data of get_data describes."""
+        return cls(data["compression"], data["stored"], data["maximum"])
+
+    def get_data(self):
+        """Return the policy as data that can be stored as JSON."""
+        return {
+            "compression": self.compression_name,
+            "stored": sorted(
+                extension for extension, rule in self.extensions.items()
+                if rule == "stored"
+            ),
+            "maximum": sorted(
+                extension for extension, rule in self.extensions.items()
+                if rule == "maximum"
+            ),
+        }
+
+    def get_rule(self, file):
+        """Return the name of the rule that applies to the given file."""
+        name = file[file.rfind("/") + 1:]
+        if "." not in name:
+            return "default"
+        return self.extensions.get(name.rsplit(".", 1)[1].lower(), "default")
+
+    def get_settings(self, file):
+        """Return the compression type and level of the given file."""
+        return self.rules[self.get_rule(file)]
+
+
+class DirectorySource:
+    """Reads the files of a release from a directory."""
+
+    def __init__(self, directory):
+        """Store the directory the files are relative to."""
+        self.directory = directory
+
+    def read_file(self, file):
+        """Return the contents of the given file."""
+        return (self.directory / file).read_bytes()
+
+
+class ObjectSource:
+    """Reads the files of a release from git objects.
+
+    object_ids maps each file to the id of its blob, which reader's read
+    method returns the contents of.
+    """
+
+    def __init__(self, reader, object_ids):
+        """Store the object reader and the blob id of each file."""
+        self.reader = reader
+        self.object_ids = object_ids
+
+    def read_file(self, file):
+        """Return the contents of the given file."""
+        return self.reader.read(self.object_ids[file])
+
+
+class ReleaseArchive:
+    """Builds a release zip from the files of a source.
+
+    Entries are written in sorted order with normalized metadata, so the
+    same files always produce a byte for byte identical zip.
+    """
+
+    reused = 0
+
+    def __init__(  # noqa: PLR0913
+        self, zip_path, source, previous_zip_path=None, policy=None, *,
+        previous_policy=None, workers=1, max_pending=64 * 1024 ** 2,
+    ):
+        """Store the zip to create and the source files are read from.
+
+        source is either the directory the files are relative to, or an
+        object whose read_file method returns a file's contents.  When
+        previous_zip_path is given along with the previous_policy it was
+        built with, members whose content has not changed are copied from
+        that zip without being compressed again, as long as that policy
+        compressed them the same way.  With more than one worker, files are
+        compressed in that many threads while holding at most max_pending
+        bytes of them at once.
+        """
+        self.zip_path = zip_path
+        self.source = (
+            source if hasattr(source, "read_file") else DirectorySource(source)
+        )
+        self.previous_zip_path = previous_zip_path
+        self.policy = CompressionPolicy() if policy is None else policy
+        self.previous_policy = previous_policy
+        self.workers = workers
+        self.max_pending = max_pending
+        self.statistics = {}
+
+    def build(self, files):
+        """Create the zip with the given files and their parent directories.
+
+        The zip is written to a temporary file first, so an interrupted
+        build never leaves a partial release behind.
+        """
+        self.reused = 0
+        self.statistics = {}
+        files = sorted(files)
+        temp_path = self.zip_path.parent / f"{self.zip_path.name}.partial"
+        previous_zip = None
+        if (
+            self.previous_zip_path is not None and
+            self.previous_policy is not None
+        ):
+            previous_zip = ZipFile(self.previous_zip_path)
+
+        try:
+            with ZipFile(temp_path, "w", self.policy.compression) as zip_file:
+
+                # Add each directory entry exactly once
+                with profiling.span("archive.directories"):
+                    for directory in get_directory_entries(files):
+                        zip_file.writestr(get_entry_info(directory), b"")
+
+                # Add the files themselves
+                with profiling.span("archive.files", files=len(files)):
+                    self._add_files(files, zip_file, previous_zip)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                temp_path.unlink()
+            raise
+        finally:
+            if previous_zip is not None:
+                previous_zip.close()
+
+        temp_path.replace(self.zip_path)
+
+    def print_statistics(self):
+        """Print the time and size effect of each compression rule."""
+        print(
+            f"{'Rule':<8}  {'Files':>6}  {'Size':>12}  {'Compressed':>12}"
+            f"  {'Ratio':>6}  {'Time (s)':>8}",
+        )
+        for rule, (count, size, compressed, seconds) in sorted(
+            self.statistics.items(),
+        ):
+            ratio = compressed / size if size else 1
+            print(
+                f"{rule:<8}  {count:>6}  {size:>12}  {compressed:>12}"
+                f"  {ratio:>6.1%}  {seconds:>8.2f}",
+            )
+
+    def _add_files(self, files, zip_file, previous_zip):
+        """Add the given files in order, compressing them in worker threads.
+
+        Files are read and written on the calling thread, so the zip's
+        entries are always in the same order, while zlib compresses them
+        in the pool without holding the GIL.  Once more than max_pending
+        bytes of files wait to be written, the oldest one is waited for.
+        """
+        if self.workers <= 1:
+            for file in files:
+                self._add_file(file, zip_file, previous_zip)
+            return
+
+        pending = deque()
+        pending_size = 0
+        with ThreadPoolExecutor(self.workers) as executor:
+            for file in files:
+                rule = self.policy.get_rule(file)
+                compress_type, compresslevel = self.policy.rules[rule]
+                start = perf_counter()
+                data = self.source.read_file(file)
+                entry = self._get_reused_entry(
+                    file, data, previous_zip, compress_type, compresslevel,
+                )
+                if entry is not None:
+                    future = Future()
+                    future.set_result((*entry, perf_counter() - start))
+
+                # Are there enough bytes to be worth handing to a thread?
+                elif len(data) < _THREAD_MIN_SIZE:
+                    future = Future()
+                    future.set_result(_compress_entry(
+                        file, data, compress_type, compresslevel,
+                    ))
+                else:
+                    future = executor.submit(
+                        _compress_entry, file, data, compress_type,
+                        compresslevel,
+                    )
+
+                pending.append((rule, len(data), future))
+                pending_size += len(data)
+
+                # Write every entry that is ready, or has to be waited for
+                while pending and (
+                    pending_size > self.max_pending or pending[0][2].done()
+                ):
+                    rule, size, future = pending.popleft()
+                    pending_size -= size
+                    self._write_entry(rule, zip_file, *future.result())
+
+            for rule, _, future in pending:
+                self._write_entry(rule, zip_file, *future.result())
+
+    def _add_file(self, file, zip_file, previous_zip):
+        """Add the given file using its compression rule."""
+        rule = self.policy.get_rule(file)
+        compress_type, compresslevel = self.policy.rules[rule]
+        start = perf_counter()
+        data = self.source.read_file(file)
+        entry = self._get_reused_entry(
+            file, data, previous_zip, compress_type, compresslevel,
+        )
+        if entry is None:
+            zinfo = get_entry_info(file)
+            zinfo.compress_type = compress_type
+            zip_file.writestr(zinfo, data, compresslevel=compresslevel)
+            self._store_statistics(rule, zinfo, perf_counter() - start)
+        else:
+            self._write_entry(
+                rule, zip_file, *entry, perf_counter() - start,
+            )
+
+    def _write_entry(self, rule, zip_file, zinfo, data, seconds):
+        """Write the compressed entry to the zip."""
+        write_raw_entry(zip_file, zinfo, data)
+        self._store_statistics(rule, zinfo, seconds)
+
+    def _store_statistics(self, rule, zinfo, seconds):
+        """Store the effect of the rule on the given entry."""
+        profiling.count("archive.bytes_read", zinfo.file_size)
+        profiling.count("archive.bytes_written", zinfo.compress_size)
+        count, size, compressed, total = self.statistics.get(
+            rule, (0, 0, 0, 0.0),
+        )
+        self.statistics[rule] = (
+            count + 1,
+            size + zinfo.file_size,
+            compressed + zinfo.compress_size,
+            total + seconds,
+        )
+
+    def _get_reused_entry(
+        self, file, data, previous_zip, compress_type, compresslevel,
+    ):
+        """Return the file's compressed entry from the previous zip.
+
+        Returns None if there is no previous zip, the file has changed or
+        the previous zip's policy compressed it differently.
+        """
+        if previous_zip is None or self.previous_policy.get_settings(
+            file,
+        ) != (compress_type, compresslevel):
+            return None
+
+        # Is there a plain entry with the same content to reuse?
+        previous = previous_zip.NameToInfo.get(file)
+        if (
+            previous is None or
+            previous.flag_bits & _ENCRYPTED_FLAG or
+            previous.compress_type != compress_type or
+            previous.file_size != len(data) or
+            crc32(data) != previous.CRC
+        ):
+            return None
+
+        zinfo = get_entry_info(file)
+        zinfo.compress_type = compress_type
+        zinfo.CRC = previous.CRC
+        zinfo.file_size = previous.file_size
+        zinfo.compress_size = previous.compress_size
+        zinfo.flag_bits = previous.flag_bits
+        self.reused += 1
+        profiling.count("archive.reused")
+        return zinfo, read_raw_entry(previous_zip, previous)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _compress_entry(file, data, compress_type, compresslevel):
+    """Return the entry of the file compressed the way ZipFile.writestr does.
+
+    This runs in a worker thread and returns the entry's ZipInfo, its
+    compressed data and the seconds compressing it took.
+    """
+    start = perf_counter()
+    compressed = _compress(data, compress_type, compresslevel)
+
+    zinfo = get_entry_info(file)
+    zinfo.compress_type = compress_type
+    zinfo.CRC = crc32(data)
+    zinfo.file_size = len(data)
+    zinfo.compress_size = len(compressed)
+    if compress_type == ZIP_LZMA:
+        zinfo.flag_bits |= _LZMA_END_MARKER_FLAG
+    return zinfo, compressed, perf_counter() - start
+
+
+def _compress(data, compress_type, compresslevel):
+    """Return the data compressed the same way ZipFile.writestr would."""
+    if compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION if compresslevel is None
+            else compresslevel,
+            zlib.DEFLATED,
+            -15,
+        )
+    elif compress_type == ZIP_BZIP2:
+        compressor = bz2.BZ2Compressor(
+            9 if compresslevel is None else compresslevel,
+        )
+    elif compress_type == ZIP_LZMA:
+        compressor = lzma.LZMACompressor(
+            lzma.FORMAT_RAW, filters=[_LZMA_FILTER],
+        )
+        return _LZMA_HEADER + compressor.compress(data) + compressor.flush()
+    else:
+        return data
+    return compressor.compress(data) + compressor.flush()
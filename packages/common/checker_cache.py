@@ -0,0 +1,156 @@
+# ../common/checker_cache.py
+
+"""Provides the content-hash cache of plugin checker results."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import json
+import os
+import re
+from contextlib import suppress
+from hashlib import sha256
+
+# Package
+from common.constants import CACHE_DIR, CHECKER_CACHE_SIZE
+
+# Site-Package
+from path import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the file types ruff checks
+_checked_suffixes = (".py", ".pyi")
+
+# Store the configuration files ruff reads, in the order it prefers them
+_config_names = (".ruff.toml", "ruff.toml", "pyproject.toml")
+
+# Store the table header a pyproject.toml needs for ruff to read it
+_ruff_table = re.compile(r"^\s*\[tool\.ruff[.\]]", re.MULTILINE)
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class CheckerCache:
+    """Stores the diagnostics of each checked plugin by content hash.
+
+    An entry's key covers every file ruff checks in the plugin, the ruff
+    version and the ruff configuration that applies to the plugin, so any
+    change to one of them is a cache miss.  Entries are single JSON files,
+    and the least recently used ones are removed once the cache grows past
+    its size limit.
+    """
+
+    def __init__(self, directory, max_size):
+        """Store the cache directory and its size limit in bytes."""
+        self.directory = directory
+        self.max_size = max_size
+
+    def get_key(self, plugin_path, ruff_version):
+        """Return the cache key of the plugin at the given path."""
+        digest = sha256(ruff_version.encode())
+        config_file = _find_config_file(plugin_path)
+        if config_file is not None:
+            digest.update(config_file.read_bytes())
+
+        for file in sorted(_get_checked_files(os.fspath(plugin_path))):
+            digest.update(os.path.relpath(file, plugin_path).encode())
+            digest.update(b"\0")
+            digest.update(sha256(Path(file).read_bytes()).digest())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the diagnostics stored for the given key, or None."""
+        path = self.directory / f"{key}.json"
+        try:
+            diagnostics = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        with suppress(OSError):
+            path.utime()
+        return diagnostics
+
+    def set(self, key, diagnostics):
+        """Store the diagnostics for the given key."""
+        self.directory.makedirs_p()
+        path = self.directory / f"{key}.json"
+        temp_path = path + ".tmp"
+        temp_path.write_text(json.dumps(diagnostics))
+        temp_path.replace(path)
+
+    def evict(self):
+        """Remove the least recently used entries over the size limit."""
+        try:
+            with os.scandir(self.directory) as entries:
+                files = [
+                    (entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                    for entry in entries
+                    if entry.name.endswith(".json")
+                ]
+        except OSError:
+            return
+
+        size = sum(file[1] for file in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            with suppress(OSError):
+                Path(path).remove()
+                size -= file_size
+
+
+checker_cache = CheckerCache(CACHE_DIR / "checker", CHECKER_CACHE_SIZE)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _find_config_file(path):
+    """Return the ruff configuration file nearest to the given path."""
+    directory = path.absolute()
+    while True:
+        for name in _config_names:
+            config_file = directory / name
+            if config_file.is_file() and (
+                name != "pyproject.toml" or _has_ruff_table(config_file)
+            ):
+                return config_file
+
+        # Was the root directory reached?
+        if directory.parent == directory:
+            return None
+        directory = directory.parent
+
+
+def _has_ruff_table(pyproject_file):
+    """Return whether the pyproject.toml file configures ruff.
+
+    ruff skips pyproject.toml files without a [tool.ruff] table and keeps
+    searching the parent directories.
+    """
+    try:
+        text = pyproject_file.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return False
+    return _ruff_table.search(text) is not None
+
+
+def _get_checked_files(directory):
+    """Yield every file ruff checks below the given directory."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name != "__pycache__":
+                yield from _get_checked_files(entry.path)
+        elif entry.name.endswith(_checked_suffixes):
+            yield entry.path
@@ -0,0 +1,123 @@
+# ../common/cli.py
+
+"""Provides the shared command line options of the helper entry points.
+
+Every entry point asks its questions interactively when it is started
+without arguments.  Giving it plugin or game names instead runs it in batch
+mode, which never prompts or clears the screen, can print its results as
+JSON and reports failures through its exit code.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import sys
+from argparse import ArgumentParser
+
+# Package
+from common import profiling
+from common.constants import CACHE_DIR
+from common.functions import run_captured
+
+# Site-Package
+from path import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the exit codes used in batch mode
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+# Store the number of phases shown in the profiling summary
+_profile_summary_size = 15
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_parser(description):
+    """Return an argument parser with the shared batch mode options."""
+    parser = ArgumentParser(description=description)
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Print the results as JSON instead of text (batch mode only).",
+    )
+    parser.add_argument(
+        "--profile", nargs="?", type=Path, const=CACHE_DIR / "trace.json",
+        metavar="PATH",
+        help=(
+            "Time the main phases and write them as a Chrome trace "
+            "(default .helper_cache/trace.json)."
+        ),
+    )
+    return parser
+
+
+def parse_args(parser):
+    """Parse the arguments and start profiling if it was requested."""
+    args = parser.parse_args()
+    if args.profile is not None:
+        import atexit
+        profiling.enable()
+        atexit.register(_write_profile, args.profile, as_json=args.json)
+    return args
+
+
+def add_names_argument(parser, name, help_text):
+    """Add an option to the parser that can be given one or more names."""
+    parser.add_argument(
+        f"--{name}", action="extend", nargs="+", dest=f"{name}s",
+        metavar="NAME", help=f"{help_text} ALL selects every {name}.",
+    )
+
+
+def get_names(parser, names, choices, kind):
+    """Return the given names with ALL expanded, in the order given.
+
+    Exits through the parser if any name is not one of the choices.
+    """
+    choices = list(choices)
+    selected = []
+    for name in names:
+        for value in choices if name == "ALL" else [name]:
+            if value not in selected:
+                selected.append(value)
+
+    invalid = [name for name in selected if name not in choices]
+    if invalid:
+        parser.error(f"invalid {kind} name(s): {', '.join(invalid)}")
+    return selected
+
+
+def run_batch(function, *args, as_json=False, **kwargs):
+    """Call the given function, capturing its output in JSON mode.
+
+    Returns the function's result and the output it printed, which is
+    empty unless as_json is set as the output is printed directly then.
+    """
+    if not as_json:
+        return function(*args, **kwargs), ""
+    return run_captured(function, *args, **kwargs)
+
+
+def finish_batch(data, output, *, as_json=False, failed=False):
+    """Print the batch results as JSON if requested and exit."""
+    if as_json:
+        import json
+        print(json.dumps({**data, "output": output}, indent=2, default=str))
+    sys.exit(EXIT_FAILURE if failed else EXIT_SUCCESS)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _write_profile(path, *, as_json):
+    """Write the trace and print the profiling summary."""
+    # Keep the summary out of the JSON results
+    file = sys.stderr if as_json else sys.stdout
+    profiling.write_trace(path)
+    profiling.print_summary(_profile_summary_size, file=file)
+    print(f'\nTrace written to "{path}".', file=file)
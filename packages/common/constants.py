@@ -7,12 +7,10 @@
 # =============================================================================
 # Python
 import os
-from collections import OrderedDict
-from platform import system
+import sys
 from warnings import warn
 
 # Site-Package
-from configobj import ConfigObj
 from path import Path
 
 
@@ -23,6 +21,18 @@ class Environ:
     def __getitem__(self, item):
         return os.environ[item].strip('"')
 
+    def get(self, item, default=None):
+        """Return the given value or the default if it is not configured."""
+        value = os.environ.get(item, "").strip('"')
+        return value or default
+
+    def get_list(self, item, default=()):
+        """Return the given semi-colon separated value as a list."""
+        value = self.get(item)
+        if value is None:
+            return list(default)
+        return [x.strip() for x in value.split(";") if x.strip()]
+
 
 environ = Environ()
 
@@ -30,7 +40,7 @@ environ = Environ()
 # =============================================================================
 # >> GLOBAL VARIABLES
 # =============================================================================
-PLATFORM = system().lower()
+PLATFORM = "windows" if sys.platform == "win32" else sys.platform
 
 # Store the binary names
 _binary = "dll" if PLATFORM == "windows" else "so"
@@ -52,6 +62,40 @@ PLUGIN_ROOT_FILES_DIR = Path(environ['PLUGIN_ROOT_FILES_DIR'])
 LINK_BASE_DIRECTORY = Path(environ['LINK_BASE_DIRECTORY'])
 AUTHOR = environ["AUTHOR"]
 RELEASE_DIR = Path(environ["RELEASE_DIRECTORY"])
+LINK_WORKERS = int(environ.get("LINK_WORKERS", "4"))
+
+# Store the directory the helpers keep their caches in
+CACHE_DIR = START_DIR / ".helper_cache"
+
+# Store the Source.Python repository plugins are linked into, and its
+#   directories that are linked to each game/server
+SOURCE_PYTHON_DIR = LINK_BASE_DIRECTORY
+SOURCE_PYTHON_ADDONS_DIR = SOURCE_PYTHON_DIR / "addons" / "source-python"
+SOURCE_PYTHON_BUILDS_DIR = SOURCE_PYTHON_DIR.joinpath(
+    "src", "Builds", "Windows" if PLATFORM == "windows" else "Linux",
+)
+source_python_directories = ("cfg", "logs", "resource", "sound")
+source_python_addons_directories = ("data", "docs", "packages", "plugins")
+
+# Store the directories games/servers are installed in and the file that
+#   lists the supported ones
+SERVER_DIRECTORIES = [Path(x) for x in environ.get_list("SERVER_DIRECTORIES")]
+SUPPORT_FILE = Path(__file__).absolute().parent.parent.parent.joinpath(
+    "tools", "support.ini",
+)
+
+# Store the file the checker writes its machine-readable report to
+CHECKER_REPORT_FILE = Path(
+    environ.get("CHECKER_REPORT_FILE", CACHE_DIR / "checker_report.json"),
+)
+
+# Store how long the watcher waits for changes to settle and how often it
+#   scans for changes when inotify is not available, in seconds
+WATCH_DEBOUNCE = float(environ.get("WATCH_DEBOUNCE", "0.3"))
+WATCH_POLL_INTERVAL = float(environ.get("WATCH_POLL_INTERVAL", "1"))
+
+# Store the maximum size of the checker's result cache in megabytes
+CHECKER_CACHE_SIZE = int(environ.get("CHECKER_CACHE_SIZE", "16")) * 1024 ** 2
 
 _readable_data = [
     "ini",
@@ -79,10 +123,40 @@ EXCEPTION_FILETYPES = {
     TRANSLATIONS_BASE_PATH: ["_server.ini"],
 }
 
-SEMANTIC_VERSIONING_COUNT = 3
+# Store the compression policy for release archives
+RELEASE_COMPRESSION = environ.get("RELEASE_COMPRESSION", "deflated").lower()
+RELEASE_STORED_FILETYPES = environ.get_list(
+    "RELEASE_STORED_FILETYPES",
+    ["mp3", "wav", "vtf"],
+)
+RELEASE_MAX_COMPRESSION_FILETYPES = environ.get_list(
+    "RELEASE_MAX_COMPRESSION_FILETYPES",
+    ["cfg", "ini", "json", "md", "py", "txt", "vdf", "vmt", "xml"],
+)
+
+# Warn about compression rules for file types that are never released
+_allowed_extensions = {
+    extension
+    for extensions in ALLOWED_FILETYPES.values()
+    for extension in extensions
+}
+for _extension in {
+    *RELEASE_STORED_FILETYPES,
+    *RELEASE_MAX_COMPRESSION_FILETYPES,
+} - _allowed_extensions:
+    warn(
+        f'Compression rule given for file type "{_extension}" which is not '
+        f"in ALLOWED_FILETYPES.",
+    )
+
+# Store the number of threads release entries are compressed in, or None to
+#   split the CPUs between the releases built at once, and the maximum size
+#   in megabytes of the data they may hold at once
+RELEASE_WORKERS = environ.get("RELEASE_WORKERS")
+if RELEASE_WORKERS is not None:
+    RELEASE_WORKERS = int(RELEASE_WORKERS)
+RELEASE_PENDING_SIZE = int(
+    environ.get("RELEASE_PENDING_SIZE", "64"),
+) * 1024 ** 2
 
-# Get a list of all plugins
-PLUGIN_LIST = [
-    x.stem for x in START_DIR.dirs()
-    if not x.stem.startswith((".", "_"))
-]
+SEMANTIC_VERSIONING_COUNT = 3
@@ -0,0 +1,122 @@
+# ../common/filetypes.py
+
+"""Provides the classifier deciding which repository files get released."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from typing import NamedTuple
+
+# Package
+from common.constants import ALLOWED_FILETYPES, EXCEPTION_FILETYPES
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+OUTSIDE_ALLOWED_DIRECTORIES = "not in an allowed directory"
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _normalize(path):
+    """Return the given path with forward slashes and no outer slashes."""
+    return str(path).replace("\\", "/").strip("/")
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class Classification(NamedTuple):
+    """The result of classifying a batch of files."""
+
+    accepted: list
+    rejected: list
+    rules: dict
+
+
+class _Node:
+    """A directory in the base path prefix trie."""
+
+    __slots__ = ("base_path", "children")
+
+    def __init__(self):
+        """Store the node's children and the base path ending at it."""
+        self.children = {}
+        self.base_path = None
+
+
+class FileClassifier:
+    """Classifies repository files against the allowed file types.
+
+    The base paths are compiled once into a prefix trie of directory names,
+    so each file is matched by walking its directories a single time and the
+    most specific base path always wins.
+    """
+
+    def __init__(self, allowed_filetypes, exception_filetypes):
+        """Compile the given base paths, extensions and exceptions."""
+        self._root = _Node()
+        self._extensions = {}
+        self._exceptions = {}
+        for path, extensions in allowed_filetypes.items():
+            base_path = _normalize(path)
+            node = self._root
+            for name in base_path.split("/"):
+                node = node.children.setdefault(name, _Node())
+            node.base_path = base_path
+            self._extensions[base_path] = frozenset(
+                extension.lower() for extension in extensions
+            )
+
+        for path, suffixes in exception_filetypes.items():
+            self._exceptions[_normalize(path)] = tuple(suffixes)
+
+    def get_base_path(self, file):
+        """Return the most specific allowed base path containing the file."""
+        base_path = None
+        node = self._root
+        for name in file.split("/")[:-1]:
+            node = node.children.get(name)
+            if node is None:
+                break
+            if node.base_path is not None:
+                base_path = node.base_path
+        return base_path
+
+    def get_rule(self, file):
+        """Return whether the file is accepted and the rule that decided it."""
+        file_path = _normalize(file)
+        base_path = self.get_base_path(file_path)
+        if base_path is None:
+            return False, OUTSIDE_ALLOWED_DIRECTORIES
+
+        name = file_path[file_path.rfind("/") + 1:]
+        suffixes = self._exceptions.get(base_path, ())
+        if name.endswith(suffixes):
+            suffix = next(x for x in suffixes if name.endswith(x))
+            return False, f'"*{suffix}" files are excluded from "{base_path}"'
+
+        extension = name.rsplit(".", 1)[1].lower() if "." in name else ""
+        if extension not in self._extensions[base_path]:
+            return (
+                False,
+                f'".{extension}" files are not allowed in "{base_path}"',
+            )
+
+        return True, f'".{extension}" files are allowed in "{base_path}"'
+
+    def classify(self, files):
+        """Classify all the given files in one batch."""
+        accepted = []
+        rejected = []
+        rules = {}
+        for file in files:
+            is_accepted, rules[file] = self.get_rule(file)
+            (accepted if is_accepted else rejected).append(file)
+        return Classification(accepted, rejected, rules)
+
+
+release_file_classifier = FileClassifier(ALLOWED_FILETYPES, EXCEPTION_FILETYPES)
@@ -6,17 +6,33 @@
 # >> IMPORTS
 # =============================================================================
 # Python
-from contextlib import suppress
+from contextlib import redirect_stdout, suppress
+from hashlib import sha256
+from io import StringIO
 from os import system
 from warnings import warn
 
 # Package
 from common.constants import (
+    CACHE_DIR,
     CORE_BINARY,
     PLATFORM,
     SOURCE_BINARY,
-    PLUGIN_LIST,
+    SOURCE_PYTHON_ADDONS_DIR,
+    SOURCE_PYTHON_BUILDS_DIR,
+    SOURCE_PYTHON_DIR,
+    source_python_addons_directories,
+    source_python_directories,
 )
+from common.links import (
+    apply_links,
+    link_manifest,
+    plan_links,
+    print_link_results,
+)
+from common.plugins import plugin_registry
+from common.profiling import count, timed
+from common.servers import supported_games
 
 
 # =============================================================================
@@ -24,16 +40,29 @@ from common.constants import (
 # =============================================================================
 def clear_screen():
     """Clear the screen."""
+    count("spawn.shell")
     system("cls" if PLATFORM == "windows" else "clear")
 
 
+def run_captured(function, *args, **kwargs):
+    """Call the given function and return its result and printed output.
+
+    This is used to run helpers in worker processes, so that each worker's
+    messages can be shown together once it has finished.
+    """
+    output = StringIO()
+    with redirect_stdout(output):
+        result = function(*args, **kwargs)
+    return result, output.getvalue()
+
+
 def get_plugin(suffix, *, allow_all=True):
     """Return a plugin by name to do something with."""
     # Clear the screen
     clear_screen()
 
     # Are there any plugins?
-    if not PLUGIN_LIST:
+    if not plugin_registry:
         print(f"There are no plugins to {suffix}.")
         return None
 
@@ -41,20 +70,20 @@ def get_plugin(suffix, *, allow_all=True):
     message = f"What plugin would you like to {suffix}?\n\n"
 
     # Loop through each plugin
-    for number, plugin in enumerate(PLUGIN_LIST, 1):
+    for number, plugin in enumerate(plugin_registry, 1):
 
         # Add the current plugin
         message += f"\t({number}) {plugin}\n"
 
     # Add ALL to the list if it needs to be
     if allow_all:
-        message += f"\t({len(PLUGIN_LIST) + 1}) ALL\n"
+        message += f"\t({len(plugin_registry) + 1}) ALL\n"
 
     # Ask which plugin to do something with
     value = input(f"{message}\n").strip()
 
     # Was a plugin name given?
-    if value in [*PLUGIN_LIST, "ALL"]:
+    if value in plugin_registry or value == "ALL":
 
         # Return the value
         return value
@@ -66,13 +95,13 @@ def get_plugin(suffix, *, allow_all=True):
         value = int(value)
 
         # Was the value a valid plugin choice?
-        if value <= len(PLUGIN_LIST):
+        if value <= len(plugin_registry):
 
             # Return the plugin by index
-            return PLUGIN_LIST[value - 1]
+            return plugin_registry[value - 1]
 
         # Was ALL's choice given?
-        if value == len(PLUGIN_LIST) + 1 and allow_all:
+        if value == len(plugin_registry) + 1 and allow_all:
 
             # Return ALL
             return "ALL"
@@ -134,99 +163,52 @@ def get_game():
     return get_game()
 
 
-def link_directory(src, dest):
-    """Create a symbolic link for the given source at the given destination."""
-    # Is this a Windows OS?
-    if PLATFORM == "windows":
-
-        # Link using Windows format
-        system(f'mklink /J "{dest}" "{src}"')
-
-    # Is this a Linux OS?
-    else:
-
-        # Link using Linux format
-        system(f'ln -s "{src}" "{dest}"')
-
+@timed("functions.link_source_python")
+def link_source_python(game_name, bin_cache=None):
+    """Link Source.Python's repository to the given game/server.
 
-def link_file(src, dest):
-    """Create a hard link for the given source at the given destination."""
-    # Is this a Windows OS?
-    if PLATFORM == "windows":
-
-        # Link using Windows format
-        system(f'mklink /H "{dest}" "{src}"')
-
-    # Is this a Linux OS?
-    else:
-
-        # Link using Linux format
-        system(f'ln -s "{src}" "{dest}"')
-
-
-def link_source_python(game_name):
-    """Link Source.Python's repository to the given game/server."""
+    bin_cache is the path prepare_bin_cache returned, so linking many
+    servers only prepares the cache once.  It is prepared here if not given.
+    Returns the result of every link that was planned.
+    """
     # Get the path to the game/server
     path = supported_games[game_name]["directory"]
 
-    # Loop through each directory to link
-    for dir_name in source_python_directories:
-
-        # Get the directory path
-        directory = path / dir_name
-
-        # Create the directory if it doesn't exist
-        if not directory.is_dir():
-            directory.makedirs()
-
-        # Get the source-python path
-        sp_dir = directory / "source-python"
-
-        # Does the source-python sub-directory already exist?
-        if sp_dir.is_dir():
-            print(
-                f"Cannot link ../{dir_name}/source-python/ directory."
-                f"  Directory already exists.\n",
-            )
-            continue
-
-        # Link the directory
-        link_directory(
-            SOURCE_PYTHON_DIR / dir_name / "source-python", sp_dir,
-        )
-        print(f"Successfully linked ../{dir_name}/source-python/\n")
-
     # Get the server's addons directory
     server_addons = path / "addons" / "source-python"
 
-    # Create the addons directory if it doesn't exist
-    if not server_addons.is_dir():
-        server_addons.makedirs()
-
-    # Loop through each directory to link
-    for dir_name in source_python_addons_directories:
-
-        # Get the directory path
-        directory = server_addons / dir_name
-
-        # Does the directory already exist on the server?
-        if directory.is_dir():
-            print(
-                f"Cannot link ../addons/source-python/{dir_name}/ "
-                f"directory.  Directory already exists.\n",
+    # Link all the directories in one batch
+    links = [
+        *(
+            (
+                SOURCE_PYTHON_DIR / dir_name / "source-python",
+                path / dir_name / "source-python",
+                "directory",
             )
-            continue
-
-        # Link the directory
-        link_directory(SOURCE_PYTHON_ADDONS_DIR / dir_name, directory)
-        print(f"Successfully linked ../addons/source-python/{dir_name}/\n")
+            for dir_name in source_python_directories
+        ),
+        *(
+            (
+                SOURCE_PYTHON_ADDONS_DIR / dir_name,
+                server_addons / dir_name,
+                "directory",
+            )
+            for dir_name in source_python_addons_directories
+        ),
+    ]
+    results = apply_links(
+        plan_links(links, link_manifest), manifest=link_manifest,
+    )
+    print_link_results(results)
 
     # Get the bin directory
     bin_dir = server_addons / "bin"
 
-    # Copy the bin directory if it doesn't exist
+    # Clone the bin directory from the cache if it doesn't exist
     if not bin_dir.is_dir():
-        SOURCE_PYTHON_ADDONS_DIR.joinpath("bin").copytree(bin_dir)
+        if bin_cache is None:
+            bin_cache = prepare_bin_cache()
+        clone_tree(bin_cache, bin_dir)
 
     # Get the .vdf's path
     vdf = path / "addons" / "source-python.vdf"
@@ -248,11 +230,75 @@ def link_source_python(game_name):
             f'Build "{supported_games[game_name]["branch"]}" does not exist. '
             f'Please create the build.',
         )
-        return
+        return results
 
     # Link the files
-    link_file(build_dir / SOURCE_BINARY, path / "addons" / SOURCE_BINARY)
-    link_file(
-        build_dir / CORE_BINARY,
-        path / "addons" / "source-python" / "bin" / CORE_BINARY,
+    links = [
+        (build_dir / SOURCE_BINARY, path / "addons" / SOURCE_BINARY, "file"),
+        (build_dir / CORE_BINARY, bin_dir / CORE_BINARY, "file"),
+    ]
+    binary_results = apply_links(
+        plan_links(links, link_manifest), manifest=link_manifest,
     )
+    print_link_results(binary_results)
+    return results + binary_results
+
+
+@timed("functions.prepare_bin_cache")
+def prepare_bin_cache():
+    """Return the cached copy of Source.Python's bin directory.
+
+    The cache is refreshed whenever the bin directory's files change, so
+    every server can be cloned from one up to date copy.
+    """
+    source = SOURCE_PYTHON_ADDONS_DIR / "bin"
+    cache = CACHE_DIR / "bin"
+    signature_file = CACHE_DIR / "bin.signature"
+    signature = _get_tree_signature(source)
+
+    # Is the cache up to date?
+    if (
+        cache.is_dir() and
+        signature_file.is_file() and
+        signature_file.read_text() == signature
+    ):
+        return cache
+
+    if cache.is_dir():
+        cache.rmtree()
+    source.copytree(cache)
+    signature_file.write_text(signature)
+    return cache
+
+
+@timed("functions.clone_tree")
+def clone_tree(src, dest):
+    """Clone the src directory to dest using hard links where possible.
+
+    Files that cannot be hard linked, for instance because dest is on
+    another drive, are copied instead.
+    """
+    dest.makedirs_p()
+    for directory in src.walkdirs():
+        (dest / src.relpathto(directory)).makedirs_p()
+
+    for file in src.walkfiles():
+        try:
+            file.link(dest / src.relpathto(file))
+        except OSError:
+            file.copy2(dest / src.relpathto(file))
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_tree_signature(directory):
+    """Return a signature of the names, sizes and times of all files."""
+    signature = sha256()
+    for file in sorted(directory.walkfiles()):
+        info = file.stat()
+        signature.update(
+            f"{directory.relpathto(file)}|{info.st_size}|"
+            f"{info.st_mtime_ns}\n".encode(),
+        )
+    return signature.hexdigest()
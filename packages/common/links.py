@@ -0,0 +1,440 @@
+# ../common/links.py
+
+"""Provides the link engine used to link plugins and Source.Python."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager, suppress
+from time import monotonic, sleep
+from typing import NamedTuple
+
+# Package
+from common.constants import CACHE_DIR, PLATFORM
+from common.profiling import count, span, timed
+
+# Site-Package
+from path import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store how long a Windows lock is waited for before giving up, as it can
+#   only be polled for
+_lock_timeout = 30
+_lock_interval = 0.05
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class LinkAction(NamedTuple):
+    """A planned link and what needs to be done for it."""
+
+    src: Path
+    dest: Path
+    kind: str
+    action: str
+    reason: str
+
+
+class LinkResult(NamedTuple):
+    """The outcome of applying a planned link."""
+
+    link: LinkAction
+    status: str
+    error: str | None = None
+
+    @property
+    def failed(self):
+        """Return whether the link could not be made."""
+        return self.status in ("conflict", "failed")
+
+    def as_dict(self):
+        """Return the result as a dictionary that can be dumped to JSON."""
+        return {
+            "src": None if self.link.src is None else str(self.link.src),
+            "dest": str(self.link.dest),
+            "kind": self.link.kind,
+            "status": self.status,
+            "reason": self.link.reason,
+            "error": self.error,
+        }
+
+
+class LinkManifest:
+    """Records every link the helpers created, stored as JSON on disk.
+
+    Each entry is keyed by its destination and stores the source, the kind
+    of link and, for hard links, the file identity both paths shared when
+    the link was created.  This lets later runs tell a correct link from a
+    stale one with a single stat and without guessing whether an existing
+    destination belongs to the helpers.
+    """
+
+    def __init__(self, path):
+        """Store the path of the manifest file."""
+        self.path = path
+        self._entries = None
+        self._changes = {}
+
+    @property
+    def entries(self):
+        """Return the manifest's entries, loading them on first use."""
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def reload(self):
+        """Discard the loaded entries so they are read again on next use."""
+        self._entries = None
+
+    def get(self, dest):
+        """Return the entry for the given destination, or None."""
+        return self.entries.get(os.fspath(dest))
+
+    def add(self, link):
+        """Record the given link as created by the helpers."""
+        entry = {"src": os.fspath(link.src), "kind": link.kind}
+        if link.kind == "file":
+            entry["identity"] = _get_identity(link.dest)
+        self.entries[os.fspath(link.dest)] = self._changes[
+            os.fspath(link.dest)
+        ] = entry
+
+    def remove(self, dest):
+        """Forget the link at the given destination."""
+        self.entries.pop(os.fspath(dest), None)
+        self._changes[os.fspath(dest)] = None
+
+    def save(self):
+        """Write the changes made since the last save to disk.
+
+        The file is re-read under a lock first, so processes linking at the
+        same time do not overwrite each other's entries.
+        """
+        if not self._changes:
+            return
+
+        self.path.parent.makedirs_p()
+        with self._lock():
+            entries = self._read()
+            for dest, entry in self._changes.items():
+                if entry is None:
+                    entries.pop(dest, None)
+                else:
+                    entries[dest] = entry
+
+            temp_path = self.path + ".tmp"
+            temp_path.write_text(json.dumps(entries, indent=1, sort_keys=True))
+            temp_path.replace(self.path)
+
+        self._entries = entries
+        self._changes = {}
+
+    def _read(self):
+        """Return the entries currently stored on disk."""
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _lock(self):
+        """Hold an exclusive lock while the manifest is written.
+
+        The lock is taken through the operating system, so it is released
+        as soon as its process exits, even if that process crashed.
+        """
+        lock_path = self.path + ".lock"
+        with lock_path.open("a+b") as lock_file:
+            _lock_file(lock_file.fileno())
+            try:
+                yield
+            finally:
+                _unlock_file(lock_file.fileno())
+
+link_manifest = LinkManifest(CACHE_DIR / "links.json")
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def plan_link(src, dest, kind, manifest=None):
+    """Return the action needed to link src at dest.
+
+    kind is either "directory" or "file".  Directories are linked with a
+    symbolic link (a junction on Windows) and files with a hard link.
+    When a manifest is given, destinations it records are checked against
+    it and replaced if their source has changed.
+    """
+    src, dest = Path(src), Path(dest)
+    if not src.exists():
+        return LinkAction(src, dest, kind, "conflict", "source does not exist")
+
+    if not (dest.exists() or dest.islink()):
+        return LinkAction(src, dest, kind, "create", "not linked yet")
+
+    entry = None if manifest is None else manifest.get(dest)
+    if entry is not None and entry["kind"] == kind:
+        action, reason = _check_entry(src, dest, kind, entry)
+        if action is not None:
+            return LinkAction(src, dest, kind, action, reason)
+
+    if _is_linked(src, dest, kind):
+        return LinkAction(src, dest, kind, "skip", "already linked")
+
+    return LinkAction(
+        src, dest, kind, "conflict", "destination already exists",
+    )
+
+
+@timed("links.plan")
+def plan_links(links, manifest=None):
+    """Return the plan for every given (src, dest, kind) link."""
+    return [plan_link(src, dest, kind, manifest) for src, dest, kind in links]
+
+
+@timed("links.apply")
+def apply_links(plan, *, dry_run=False, manifest=None):
+    """Apply the given plan and return the result of each link.
+
+    With dry_run, nothing is changed and each result's status is the
+    planned action.  Created and replaced links are recorded in the given
+    manifest, which is saved once all links have been applied.
+    """
+    results = []
+    for link in plan:
+        if dry_run or link.action not in ("create", "replace"):
+            status = link.action if dry_run else {
+                "skip": "skipped",
+                "conflict": "conflict",
+            }[link.action]
+            results.append(LinkResult(link, status))
+            continue
+
+        try:
+            if link.action == "replace":
+                remove_link(link.dest, link.kind)
+            create_link(link.src, link.dest, link.kind)
+        except OSError as error:
+            results.append(LinkResult(link, "failed", str(error)))
+            continue
+
+        results.append(LinkResult(
+            link, "created" if link.action == "create" else "replaced",
+        ))
+        count(f"links.{link.kind}")
+        if manifest is not None:
+            manifest.add(link)
+
+    if manifest is not None and not dry_run:
+        with span("links.save_manifest"):
+            manifest.save()
+
+    return results
+
+
+def create_link(src, dest, kind):
+    """Create a link of the given kind for the src Path at the dest Path."""
+    dest.parent.makedirs_p()
+
+    if kind == "file":
+        src.link(dest)
+
+    # Junctions do not need elevated privileges on Windows
+    elif PLATFORM == "windows":
+        import _winapi
+        _winapi.CreateJunction(src, dest)
+
+    else:
+        src.symlink(dest)
+
+
+def remove_link(dest, kind):
+    """Remove the link of the given kind at the dest Path."""
+    # Junctions are removed like directories on Windows
+    if kind == "directory" and PLATFORM == "windows":
+        dest.rmdir()
+    else:
+        dest.unlink()
+
+
+@timed("links.verify")
+def verify_links(roots, manifest, *, repair=True):
+    """Find dangling links under the given roots and repair the known ones.
+
+    Every root is scanned with os.scandir without following links.  A
+    dangling link that the manifest records is re-created if its source
+    still exists and removed otherwise.  Manifest entries whose link has
+    gone missing entirely are re-created as well.  Dangling links that the
+    helpers did not create are only reported.
+    """
+    dangling = set()
+    for root in roots:
+        dangling.update(_find_dangling_links(os.fspath(root)))
+
+    # Add manifest entries whose destination no longer exists at all
+    dangling.update(
+        dest for dest in manifest.entries if not os.path.lexists(dest)
+    )
+
+    results = []
+    for dest in sorted(dangling):
+        entry = manifest.get(dest)
+        if entry is None:
+            link = LinkAction(None, Path(dest), "directory", "unknown", "")
+            results.append(LinkResult(link, "unknown", "dangling link"))
+            continue
+
+        src = Path(entry["src"])
+        link = LinkAction(
+            src, Path(dest), entry["kind"], "replace", "dangling link",
+        )
+        if not repair:
+            results.append(LinkResult(link, "dangling"))
+            continue
+
+        try:
+            if os.path.lexists(dest):
+                remove_link(link.dest, link.kind)
+
+            # Is there nothing to link to anymore?
+            if not src.exists():
+                manifest.remove(dest)
+                results.append(LinkResult(link, "removed"))
+                continue
+
+            create_link(link.src, link.dest, link.kind)
+        except OSError as error:
+            results.append(LinkResult(link, "failed", str(error)))
+            continue
+
+        manifest.add(link)
+        results.append(LinkResult(link, "repaired"))
+
+    manifest.save()
+    return results
+
+
+def print_link_results(results, *, verbose=False):
+    """Print the given link results followed by a summary.
+
+    Skipped links are only printed when verbose is set.
+    """
+    for result in results:
+        if result.status == "skipped" and not verbose:
+            continue
+
+        message = f"{result.status.capitalize()}: {result.link.dest}"
+        if result.error is not None:
+            message += f" ({result.error})"
+        elif result.link.reason and result.status != "created":
+            message += f" ({result.link.reason})"
+        print(message)
+
+    counts = Counter(result.status for result in results)
+    print(", ".join(
+        f"{count} {status}" for status, count in sorted(counts.items())
+    ) or "Nothing to link.")
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _check_entry(src, dest, kind, entry):
+    """Return the action for a destination recorded in the manifest.
+
+    Returns (None, None) when the manifest cannot decide.
+    """
+    # Is the link a directory link?
+    if kind == "directory":
+        with suppress(OSError):
+            if Path(dest.readlink()) == src and entry["src"] == src:
+                return "skip", "unchanged"
+
+            # Is it still a link the helpers created?
+            if dest.islink():
+                return "replace", "source changed"
+        return None, None
+
+    # Has the helpers' hard link been replaced by another file?
+    identity = _get_identity(dest)
+    if identity != entry.get("identity"):
+        return None, None
+
+    if entry["src"] == src and _get_identity(src) == identity:
+        return "skip", "unchanged"
+
+    return "replace", "source changed"
+
+
+def _get_identity(path):
+    """Return the device and inode of the given file."""
+    info = os.lstat(path)
+    return [info.st_dev, info.st_ino]
+
+
+def _find_dangling_links(root):
+    """Yield every dangling link below the given directory."""
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_symlink() or (
+            PLATFORM == "windows" and entry.is_junction()
+        ):
+            if not Path(entry.path).exists():
+                yield entry.path
+        elif entry.is_dir(follow_symlinks=False):
+            yield from _find_dangling_links(entry.path)
+
+
+def _is_linked(src, dest, kind):
+    """Return whether dest is already a link to src."""
+    try:
+        if kind == "file":
+            return src.samefile(dest)
+        return dest.realpath() == src.realpath()
+    except OSError:
+        return False
+
+
+def _lock_file(descriptor):
+    """Wait for an exclusive lock on the open file."""
+    if PLATFORM != "windows":
+        import fcntl
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        return
+
+    import msvcrt
+    os.lseek(descriptor, 0, os.SEEK_SET)
+    deadline = monotonic() + _lock_timeout
+    while True:
+        try:
+            msvcrt.locking(descriptor, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if monotonic() > deadline:
+                raise
+            sleep(_lock_interval)
+        else:
+            return
+
+
+def _unlock_file(descriptor):
+    """Release the lock taken by _lock_file."""
+    if PLATFORM != "windows":
+        import fcntl
+        fcntl.flock(descriptor, fcntl.LOCK_UN)
+        return
+
+    import msvcrt
+    os.lseek(descriptor, 0, os.SEEK_SET)
+    msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,163 @@
+# ../common/plugins.py
+
+"""Provides the registry of plugins found in the starting directory."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from os import scandir
+from typing import NamedTuple
+
+# Package
+from common.constants import (
+    CONFIG_BASE_PATH,
+    DATA_BASE_PATH,
+    DOCS_BASE_PATH,
+    EVENTS_BASE_PATH,
+    LOGS_BASE_PATH,
+    PLUGIN_BASE_PATH,
+    SOUND_BASE_PATH,
+    START_DIR,
+    TRANSLATIONS_BASE_PATH,
+)
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the base paths a plugin can have a directory or .ini file in
+base_paths = (
+    CONFIG_BASE_PATH,
+    DATA_BASE_PATH,
+    DOCS_BASE_PATH,
+    EVENTS_BASE_PATH,
+    LOGS_BASE_PATH,
+    PLUGIN_BASE_PATH,
+    SOUND_BASE_PATH,
+    TRANSLATIONS_BASE_PATH,
+)
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class PluginMetadata(NamedTuple):
+    """Information about a plugin's repository."""
+
+    name: str
+    paths: tuple
+    version: str | None
+    is_repository: bool
+
+
+class PluginRegistry:
+    """Lazily lists the plugins in a directory.
+
+    The listing is cached until the directory's modification time changes,
+    so plugins created or removed while running are always picked up
+    without rescanning the directory on every lookup.
+    """
+
+    def __init__(self, directory):
+        """Store the directory the plugins are in."""
+        self.directory = directory
+        self._mtime = None
+        self._names = []
+        self._metadata = {}
+
+    def __contains__(self, plugin_name):
+        """Return whether the given plugin exists."""
+        self._refresh()
+        return plugin_name in self._metadata
+
+    def __getitem__(self, index):
+        """Return the plugin name at the given index."""
+        self._refresh()
+        return self._names[index]
+
+    def __iter__(self):
+        """Iterate over the plugin names in sorted order."""
+        self._refresh()
+        return iter(self._names)
+
+    def __len__(self):
+        """Return the number of plugins."""
+        self._refresh()
+        return len(self._names)
+
+    def get_metadata(self, plugin_name):
+        """Return the metadata of the given plugin."""
+        self._refresh()
+        metadata = self._metadata[plugin_name]
+        if metadata is None:
+            metadata = self._metadata[plugin_name] = _get_metadata(
+                self.directory / plugin_name,
+            )
+        return metadata
+
+    def get_all_metadata(self):
+        """Return the metadata of every plugin, gathering any missing ones."""
+        self._refresh()
+        missing = [
+            plugin_name for plugin_name, metadata in self._metadata.items()
+            if metadata is None
+        ]
+        if missing:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor() as executor:
+                for metadata in executor.map(
+                    _get_metadata,
+                    [self.directory / plugin_name for plugin_name in missing],
+                ):
+                    self._metadata[metadata.name] = metadata
+
+        return [self._metadata[plugin_name] for plugin_name in self._names]
+
+    def _refresh(self):
+        """Rescan the directory if it has changed since the last scan."""
+        mtime = self.directory.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return
+
+        self._mtime = mtime
+        with scandir(self.directory) as entries:
+            self._names = sorted(
+                entry.name for entry in entries
+                if entry.is_dir() and not entry.name.startswith((".", "_"))
+            )
+        self._metadata = dict.fromkeys(self._names)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_metadata(plugin_path):
+    """Return the metadata of the plugin at the given path."""
+    plugin_name = str(plugin_path.name)
+    paths = []
+    for base_path in base_paths:
+        path = plugin_path.joinpath(base_path, plugin_name)
+        if path.is_dir():
+            paths.append(path)
+
+        # Join the suffix, as plugin names may contain dots
+        ini_path = plugin_path.joinpath(base_path, f"{plugin_name}.ini")
+        if ini_path.is_file():
+            paths.append(ini_path)
+
+    version = None
+    info_file = plugin_path.joinpath(PLUGIN_BASE_PATH, plugin_name, "info.ini")
+    if info_file.is_file():
+        from configobj import ConfigObj
+        version = ConfigObj(info_file).get("version")
+
+    return PluginMetadata(
+        name=plugin_name,
+        paths=tuple(paths),
+        version=version,
+        is_repository=plugin_path.joinpath(".git").exists(),
+    )
+
+
+plugin_registry = PluginRegistry(START_DIR)
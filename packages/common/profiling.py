@@ -0,0 +1,179 @@
+# ../common/profiling.py
+
+"""Provides lightweight phase timing that can be exported as a Chrome trace.
+
+Profiling is off by default.  While it is off, span() returns one shared
+context manager that does nothing and timed() functions only check a flag,
+so the instrumentation can stay in place permanently.  Once enabled, each
+span is recorded as a complete event that chrome://tracing and Perfetto can
+open, and the slowest phases can be printed as a summary.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import json
+import os
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter_ns
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+_enabled = False
+_events = []
+_counters = Counter()
+_null_span = nullcontext()
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class _Span:
+    """Records the time spent inside a with block as a trace event."""
+
+    __slots__ = ("args", "name", "start")
+
+    def __init__(self, name, args):
+        """Store the name and arguments of the span."""
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        """Start timing the span."""
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Record the span as a complete event."""
+        end = perf_counter_ns()
+        _events.append({
+            "name": self.name,
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args,
+        })
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def enable():
+    """Start recording spans and counters."""
+    global _enabled  # noqa: PLW0603
+    _enabled = True
+
+
+def is_enabled():
+    """Return whether spans and counters are being recorded."""
+    return _enabled
+
+
+def span(name, **args):
+    """Return a context manager that records the time spent inside it."""
+    if not _enabled:
+        return _null_span
+    return _Span(name, args)
+
+
+def timed(name=None):
+    """Return a decorator that records each call as a span."""
+    def decorator(function):
+        label = function.__qualname__ if name is None else name
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(label, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Add the value to the given counter."""
+    if _enabled:
+        _counters[name] += value
+
+
+def call_profiled(enabled, function, *args, **kwargs):
+    """Call the function in a worker process and return its events.
+
+    Returns the function's result along with the spans and counters the
+    worker recorded, which the parent adds to its own with add_events.
+    """
+    if enabled:
+        enable()
+    start = len(_events)
+    counters = Counter(_counters)
+    result = function(*args, **kwargs)
+    return result, (_events[start:], _counters - counters)
+
+
+def add_events(recorded):
+    """Add the spans and counters recorded by a worker process."""
+    events, counters = recorded
+    _events.extend(events)
+    _counters.update(counters)
+
+
+def write_trace(path):
+    """Write the recorded spans and counters as a Chrome trace."""
+    events = list(_events)
+    if events:
+        end = max(event["ts"] + event["dur"] for event in events)
+        events.extend(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": end,
+                "pid": os.getpid(),
+                "args": {name: value},
+            }
+            for name, value in sorted(_counters.items())
+        )
+
+    path.parent.makedirs_p()
+    path.write_text(json.dumps({
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+    }))
+
+
+def print_summary(top=10, file=None):
+    """Print the phases with the most total time and every counter."""
+    totals = Counter()
+    calls = Counter()
+    for event in _events:
+        totals[event["name"]] += event["dur"]
+        calls[event["name"]] += 1
+
+    if totals:
+        width = max(len("Phase"), *(len(name) for name in totals))
+        print(
+            f"\n{'Phase':<{width}}  Calls  Total (ms)  Mean (ms)", file=file,
+        )
+        print(f"{'-' * width}  -----  ----------  ---------", file=file)
+        for name, total in totals.most_common(top):
+            print(
+                f"{name:<{width}}  {calls[name]:>5}  {total / 1000:>10.1f}  "
+                f"{total / calls[name] / 1000:>9.2f}",
+                file=file,
+            )
+
+    if _counters:
+        width = max(len("Counter"), *(len(name) for name in _counters))
+        print(f"\n{'Counter':<{width}}  Value", file=file)
+        print(f"{'-' * width}  -----", file=file)
+        for name, value in sorted(_counters.items()):
+            print(f"{name:<{width}}  {value}", file=file)
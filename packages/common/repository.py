@@ -0,0 +1,397 @@
+# ../common/repository.py
+
+"""Provides fast git queries used to validate and release plugins.
+
+The queries of each repository go through one shared GitRepository, which
+keeps its git processes running between queries.  Every git process that
+is started is counted as "spawn.git" when profiling is enabled.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import atexit
+import os
+from collections import OrderedDict
+from subprocess import DEVNULL, PIPE, STDOUT, CalledProcessError, Popen, run
+from threading import Lock
+from typing import NamedTuple
+
+# Package
+from common.profiling import count, span
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# The number of space separated fields before the path in each
+#   "git status --porcelain=v2" entry type
+_status_path_fields = {
+    "1": 8,
+    "2": 9,
+    "u": 10,
+    "?": 1,
+}
+
+_read_size = 4096
+
+# Store the tree entry modes that are not files
+_tree_mode = "40000"
+_submodule_mode = "160000"
+
+# Store the mode of symbolic links, whose blobs only hold the link target
+_symlink_mode = "120000"
+
+# Store the counter of the requests sent to each cat-file process
+_cat_file_counters = {
+    "--batch": "git.cat_file",
+    "--batch-check": "git.cat_file_check",
+}
+
+# Store the shared repositories, least recently used first
+_repositories = OrderedDict()
+_repositories_lock = Lock()
+
+# Store the number of repositories whose processes are kept running
+_max_repositories = 16
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class RepositoryStatus(NamedTuple):
+    """The working tree state of a plugin repository."""
+
+    plugin_name: str
+    is_repository: bool
+    change: str | None
+
+    @property
+    def dirty(self):
+        """Return whether the repository has uncommitted changes."""
+        return self.change is not None
+
+
+class GitRepository:
+    """Runs the git queries of one repository through long-lived processes.
+
+    Objects are read through one persistent "git cat-file --batch" process
+    and looked up through one "git cat-file --batch-check" process, which
+    are only started when first needed.  Trees are walked through the same
+    processes, and the GitPython Repo handle is opened once, so validating,
+    listing and releasing a plugin costs no further git processes.
+
+    Use get_repository to share one instance per repository.
+    """
+
+    def __init__(self, repo_path):
+        """Store the path of the repository."""
+        self.repo_path = repo_path
+        self._repo = None
+        self._processes = {}
+        self._lock = Lock()
+
+    def __enter__(self):
+        """Return the repository itself."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the cat-file processes."""
+        self.close()
+
+    def get_repo(self):
+        """Return the GitPython Repo handle, or None if not a repository."""
+        if self._repo is None:
+            # Import GitPython only when it is needed, as it is slow to import
+            with span("import.git"):
+                from git import Repo
+                from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+            try:
+                with span("git.open_repository"):
+                    self._repo = Repo(self.repo_path)
+            except (InvalidGitRepositoryError, NoSuchPathError):
+                return None
+        return self._repo
+
+    def read(self, object_name):
+        """Return the contents of the given object.
+
+        object_name can be anything git can resolve, such as an id or
+        "<commit>:<path>".
+        """
+        return self._read_object(object_name)[2]
+
+    def get_info(self, object_name):
+        """Return the id, type and size of the given object, or None."""
+        with self._lock:
+            header = self._request("--batch-check", object_name)
+        if header is None:
+            return None
+        object_id, object_type, size = header
+        return object_id, object_type, int(size)
+
+    def resolve_commit(self, ref):
+        """Return the id of the commit the given ref points to, or None."""
+        info = self.get_info(f"{ref}^{{commit}}")
+        return None if info is None else info[0]
+
+    def get_tree_entries(self, ref):
+        """Return the blob id of every file in the given commit, by path.
+
+        Submodules and symbolic links are left out, as they have no file
+        contents to release.
+        """
+        tree_id, _, data = self._read_object(f"{ref}^{{tree}}")
+        hash_size = len(tree_id) // 2
+        entries = {}
+        trees = [("", data)]
+        while trees:
+            prefix, data = trees.pop()
+
+            # Each entry is "<mode> <name>\0<binary id>"
+            position = 0
+            while position < len(data):
+                space = data.index(b" ", position)
+                end = data.index(b"\0", space)
+                mode = data[position:space].decode()
+                path = prefix + data[space + 1:end].decode(
+                    "utf-8", "surrogateescape",
+                )
+                position = end + 1 + hash_size
+                object_id = data[end + 1:position].hex()
+                if mode == _tree_mode:
+                    trees.append((f"{path}/", self.read(object_id)))
+                elif mode not in (_symlink_mode, _submodule_mode):
+                    entries[path] = object_id
+        return entries
+
+    def get_index_entries(self):
+        """Return the object id of every file in the index, by path.
+
+        This is the same file list "git ls-files" gives, with the id of each
+        file's content, so unchanged content can be detected without reading
+        any file.  The index is read by the Repo handle when it can be,
+        and listed by git otherwise.
+        """
+        repo = self.get_repo()
+        if repo is not None:
+            try:
+                with span("git.read_index"):
+                    return {
+                        path: entry.hexsha
+                        for (path, stage), entry in repo.index.entries.items()
+                        if not stage
+                    }
+            except AssertionError:
+                # GitPython cannot read every index version
+                pass
+
+        entries = {}
+        output = _run_git(self.repo_path, "ls-files", "--stage", "-z")
+        for entry in output.split("\0"):
+            if entry:
+                info, path = entry.split("\t", 1)
+                entries[path] = info.split(" ", 2)[1]
+        return entries
+
+    def get_tag_commits(self):
+        """Return the commit id of every tag in the repository, by tag name."""
+        tags = {}
+        output = _run_git(
+            self.repo_path, "for-each-ref", "refs/tags",
+            "--format=%(refname:strip=2)%00%(*objectname)%00%(objectname)",
+        )
+        for line in output.splitlines():
+            tag, peeled, object_id = line.split("\0")
+
+            # Annotated tags point to a tag object, which points to the commit
+            tags[tag] = peeled or object_id
+        return tags
+
+    def get_file_commits(self, path):
+        """Return the id of every commit that changed the file, newest first."""
+        return _run_git(
+            self.repo_path, "log", "--format=%H", "--", path,
+        ).split()
+
+    def start_push(self, remote="origin"):
+        """Start pushing to the remote in the background and return the process.
+
+        git may not prompt for credentials, as nothing could answer it while
+        the push runs in the background.
+        """
+        count("spawn.git")
+        return Popen(
+            ["git", "-C", str(self.repo_path), "push", remote],
+            stdin=DEVNULL,
+            stdout=PIPE,
+            stderr=STDOUT,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+
+    def close(self):
+        """Stop the cat-file processes and close the Repo handle."""
+        with self._lock:
+            for process in self._processes.values():
+                process.stdin.close()
+                process.stdout.close()
+                process.wait()
+            self._processes.clear()
+        if self._repo is not None:
+            self._repo.close()
+            self._repo = None
+
+    def _read_object(self, object_name):
+        """Return the id, type and contents of the given object."""
+        with self._lock:
+            header = self._request("--batch", object_name)
+            if header is None:
+                msg = f'Object "{object_name}" could not be read.'
+                raise ValueError(msg)
+
+            object_id, object_type, size = header
+            size = int(size)
+            data = self._processes["--batch"].stdout.read(size + 1)[:size]
+        return object_id, object_type, data
+
+    def _request(self, mode, object_name):
+        """Send the object name to the cat-file process and return its header.
+
+        Returns None if the object does not exist.  The lock must be held,
+        and with --batch the object's contents must be read right after.
+        """
+        process = self._processes.get(mode)
+        if process is None:
+            count("spawn.git")
+            process = self._processes[mode] = Popen(
+                ["git", "-C", str(self.repo_path), "cat-file", mode],
+                stdin=PIPE,
+                stdout=PIPE,
+            )
+
+        count(_cat_file_counters[mode])
+        process.stdin.write(f"{object_name}\n".encode())
+        process.stdin.flush()
+
+        # Each object is "<id> <type> <size>\n" or "<name> missing\n"
+        header = process.stdout.readline().decode().split()
+        if len(header) != 3:  # noqa: PLR2004
+            return None
+        return header
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_repository(repo_path):
+    """Return the shared GitRepository of the given path.
+
+    Only the most recently used repositories keep their processes running,
+    so releasing many plugins does not pile up idle git processes.
+    """
+    key = os.fspath(repo_path)
+    with _repositories_lock:
+        repository = _repositories.get(key)
+        if repository is not None:
+            _repositories.move_to_end(key)
+            return repository
+
+        repository = _repositories[key] = GitRepository(repo_path)
+        if len(_repositories) > _max_repositories:
+            _, oldest = _repositories.popitem(last=False)
+            oldest.close()
+    return repository
+
+
+@atexit.register
+def close_repositories():
+    """Stop the processes of every shared repository."""
+    with _repositories_lock:
+        repositories = list(_repositories.values())
+        _repositories.clear()
+    for repository in repositories:
+        repository.close()
+
+
+def get_first_change(repo_path):
+    """Return the path of the first uncommitted change, or None if clean.
+
+    This runs a single streaming "git status" that covers staged, unstaged
+    and untracked changes, and stops it as soon as one entry is found.
+    """
+    args = [
+        "git", "--no-optional-locks", "-C", str(repo_path),
+        "status", "--porcelain=v2", "-z", "--untracked-files=normal",
+    ]
+    count("spawn.git")
+    with Popen(args, stdout=PIPE, stderr=DEVNULL) as process:
+        entry = b""
+        while b"\0" not in entry:
+            data = process.stdout.read1(_read_size)
+            if not data:
+                break
+            entry += data
+
+        # Was a change found?
+        if entry:
+            process.kill()
+            entry = entry.split(b"\0", 1)[0].decode("utf-8", "replace")
+            return entry.split(" ", _status_path_fields.get(entry[0], 0))[-1]
+
+        if process.wait():
+            raise CalledProcessError(process.returncode, args)
+
+    return None
+
+
+def get_repository_status(plugin_name, repo_path):
+    """Return the given plugin's repository status."""
+    if not (repo_path / ".git").exists():
+        return RepositoryStatus(plugin_name, is_repository=False, change=None)
+
+    try:
+        change = get_first_change(repo_path)
+    except CalledProcessError:
+        return RepositoryStatus(plugin_name, is_repository=False, change=None)
+    return RepositoryStatus(plugin_name, is_repository=True, change=change)
+
+
+def get_repository_statuses(repo_paths):
+    """Return the status of every given plugin repository concurrently.
+
+    repo_paths maps each plugin name to its repository path.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(
+            get_repository_status, repo_paths.keys(), repo_paths.values(),
+        ))
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _run_git(repo_path, *args):
+    """Run the git command in the given repository and return its output."""
+    count("spawn.git")
+    return run(
+        ["git", "-C", str(repo_path), *args],
+        stdout=PIPE,
+        check=True,
+    ).stdout.decode("utf-8", "surrogateescape")
+
+
+def _forget_repositories():
+    """Forget the repositories inherited by a forked worker process.
+
+    Their processes belong to the parent and may not be shared, so the
+    worker starts its own when it needs them.
+    """
+    _repositories.clear()
+
+
+# Windows has no fork, so its workers never inherit the repositories
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_repositories)
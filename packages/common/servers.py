@@ -0,0 +1,280 @@
+# ../common/servers.py
+
+"""Provides the index of games/servers found in the server directories.
+
+Every directory in SERVER_DIRECTORIES is scanned for the games and servers
+listed in tools/support.ini.  The result is cached along with the
+modification time of each scanned directory, so later runs only have to
+stat them and only rescan the ones that changed.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import json
+import os
+from collections.abc import Mapping
+from threading import Lock
+
+# Package
+from common.constants import CACHE_DIR, SERVER_DIRECTORIES, SUPPORT_FILE
+from common.profiling import span, timed
+
+# Site-Package
+from path import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Increase this whenever the layout of the cache file changes
+_cache_version = 1
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class ServerIndex(Mapping):
+    """Lazily maps each installed game/server to its directory and branch.
+
+    A directory below a server directory is matched by name against the
+    [servers] and [common] entries of the support file.  Directories that
+    match no entry by name are still found if they contain one of the
+    [servers] folders, and are named after the directory.
+
+    The directories are only scanned on first use, and the result is kept
+    for the rest of the run.
+    """
+
+    def __init__(self, server_directories, support_file, cache_file):
+        """Store the directories to scan and the files the index uses."""
+        self.server_directories = server_directories
+        self.support_file = support_file
+        self.cache_file = cache_file
+        self._games = None
+        self._support = None
+        self._support_lock = Lock()
+
+    def __getitem__(self, game_name):
+        """Return the directory and branch of the given game/server."""
+        return self._get_games()[game_name]
+
+    def __iter__(self):
+        """Iterate over the names of the games/servers."""
+        return iter(self._get_games())
+
+    def __len__(self):
+        """Return the number of games/servers."""
+        return len(self._get_games())
+
+    def reload(self):
+        """Discard the index so the directories are checked again."""
+        self._games = None
+
+    def _get_games(self):
+        """Return the index, loading it first if needed."""
+        if self._games is None:
+            self._games = self._load()
+        return self._games
+
+    @timed("servers.load")
+    def _load(self):
+        """Return the index, rescanning only the directories that changed."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        support_mtime = _get_mtime(self.support_file)
+        cache = self._read_cache()
+        if cache.get("support") != support_mtime:
+            cache = {}
+        cached_roots = cache.get("roots", {})
+
+        with ThreadPoolExecutor() as executor:
+
+            # List the directories of every server directory
+            roots = dict(zip(
+                map(os.fspath, self.server_directories),
+                executor.map(
+                    _scan_root,
+                    self.server_directories,
+                    [
+                        cached_roots.get(os.fspath(root))
+                        for root in self.server_directories
+                    ],
+                ),
+                strict=True,
+            ))
+
+            # Find the games/servers in each of those directories
+            jobs = [
+                (root, name, entry)
+                for root, directories in roots.items()
+                for name, entry in directories["directories"].items()
+            ]
+            for (root, name, _), entry in zip(
+                jobs,
+                executor.map(
+                    self._scan_directory,
+                    [Path(root) / name for root, name, _ in jobs],
+                    [entry for _, _, entry in jobs],
+                ),
+                strict=True,
+            ):
+                roots[root]["directories"][name] = entry
+
+        data = {
+            "version": _cache_version,
+            "support": support_mtime,
+            "server_directories": list(roots),
+            "roots": roots,
+        }
+        if data != cache:
+            self._write_cache(data)
+
+        games = {}
+        for root, directories in roots.items():
+            for name, entry in directories["directories"].items():
+                for game_name, folder, branch in entry["games"]:
+                    directory = Path(root) / name / folder
+                    games[
+                        game_name if game_name not in games
+                        else f"{game_name} ({directory})"
+                    ] = {"directory": directory, "branch": branch}
+        return games
+
+    def _scan_directory(self, directory, cached):
+        """Return the games/servers installed in the given directory."""
+        mtime = _get_mtime(directory)
+        if cached is not None and cached["mtime"] == mtime:
+            return cached
+
+        try:
+            with os.scandir(directory) as entries:
+                folders = {entry.name for entry in entries if entry.is_dir()}
+        except OSError:
+            folders = set()
+
+        install_name = str(directory.name)
+        by_install_name, server_folders = self._get_support()
+        games = [
+            [game_name, folder, branch]
+            for game_name, folder, branch in by_install_name.get(
+                install_name, (),
+            )
+            if folder in folders
+        ]
+
+        # Find servers installed in directories with any other name
+        if not games:
+            found = sorted(folders & server_folders.keys())
+            games = [
+                [
+                    install_name if len(found) == 1
+                    else f"{install_name} ({folder})",
+                    folder,
+                    server_folders[folder],
+                ]
+                for folder in found
+            ]
+
+        return {"mtime": mtime, "games": games}
+
+    def _get_support(self):
+        """Return the supported games/servers read from the support file.
+
+        Returns the (name, folder, branch) of every entry by the name of
+        the directory it is installed in, and the branch of every [servers]
+        folder.
+        """
+        with self._support_lock:
+            if self._support is None:
+                self._support = self._read_support()
+        return self._support
+
+    def _read_support(self):
+        """Read the support file for _get_support."""
+        from configobj import ConfigObj
+        with span("servers.read_support"):
+            support = ConfigObj(self.support_file)
+
+        by_install_name = {}
+        server_folders = {}
+        for section in ("servers", "common"):
+            for name, values in support.get(section, {}).items():
+                install_name = values.get("game", name).replace(":", "")
+                by_install_name.setdefault(install_name, []).append(
+                    (name, values["folder"], values["branch"]),
+                )
+                if section == "servers":
+                    server_folders[values["folder"]] = values["branch"]
+
+        return by_install_name, server_folders
+
+    def _read_cache(self):
+        """Return the cached index, or an empty one if it cannot be used."""
+        try:
+            with self.cache_file.open() as open_file:
+                cache = json.load(open_file)
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            cache.get("version") != _cache_version or
+            cache.get("server_directories") != list(
+                map(os.fspath, self.server_directories),
+            )
+        ):
+            return {}
+        return cache
+
+    def _write_cache(self, data):
+        """Write the index to the cache file."""
+        with span("servers.write_cache"):
+            self.cache_file.parent.makedirs_p()
+            temp_path = self.cache_file + f".{os.getpid()}.tmp"
+            temp_path.write_text(json.dumps(data, indent=1))
+            temp_path.replace(self.cache_file)
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_mtime(path):
+    """Return the modification time of the path, or None if it is missing."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan_root(root, cached):
+    """Return the directories of the given server directory.
+
+    The cached directories are reused if the server directory has not
+    changed, as it only changes when directories are added or removed.
+    """
+    mtime = _get_mtime(root)
+    if cached is not None and cached["mtime"] == mtime:
+        return {"mtime": mtime, "directories": dict(cached["directories"])}
+
+    directories = {}
+    try:
+        with os.scandir(root) as entries:
+            names = sorted(
+                entry.name for entry in entries
+                if entry.is_dir() and not entry.name.startswith(".")
+            )
+    except OSError:
+        names = []
+
+    for name in names:
+        entry = None if cached is None else cached["directories"].get(name)
+        directories[name] = (
+            {"mtime": None, "games": []} if entry is None else entry
+        )
+    return {"mtime": mtime, "directories": directories}
+
+
+supported_games = ServerIndex(
+    SERVER_DIRECTORIES, SUPPORT_FILE, CACHE_DIR / "servers.json",
+)
@@ -0,0 +1,255 @@
+# ../common/watcher.py
+
+"""Provides file system watchers used to react to changes as they happen."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import os
+import struct
+from abc import ABC, abstractmethod
+from time import monotonic, sleep
+
+# Package
+from common.constants import PLATFORM
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the inotify flags and event masks (see "man 7 inotify")
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+
+# Store the layout of the fixed part of each inotify event
+_event_header = struct.Struct("iIII")
+
+_read_size = 64 * 1024
+
+
+# =============================================================================
+# >> CLASSES
+# =============================================================================
+class _Watcher(ABC):
+    """Base class of the watchers with the shared filtering and debouncing.
+
+    Only directories and files ending with one of the given suffixes are
+    reported.  Directories starting with "." and __pycache__ are ignored.
+    """
+
+    def __init__(self, root, suffixes):
+        """Store the root directory and the file suffixes to report."""
+        self.root = os.fspath(root)
+        self.suffixes = tuple(suffixes)
+
+    @abstractmethod
+    def read(self, timeout=None):
+        """Return the paths changed within the timeout in seconds."""
+
+    def close(self):
+        """Release the watcher's resources.
+
+        This is an optional hook, as only some watchers hold resources.
+        """
+        return
+
+    def iter_changes(self, debounce):
+        """Yield each batch of changed paths once they stop changing.
+
+        A batch is only yielded after no further change has been seen for
+        debounce seconds, so saving many files at once triggers one batch.
+        """
+        while True:
+            changes = self.read()
+            while True:
+                more = self.read(debounce)
+                if not more:
+                    break
+                changes |= more
+            yield changes
+
+    def _is_ignored(self, name):
+        """Return whether the given directory name is ignored."""
+        return name.startswith(".") or name == "__pycache__"
+
+    def _walk(self, directory):
+        """Yield every directory and reported file below the directory."""
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not self._is_ignored(entry.name):
+                    yield entry
+                    yield from self._walk(entry.path)
+            elif entry.name.endswith(self.suffixes):
+                yield entry
+
+
+class InotifyWatcher(_Watcher):
+    """Watches a directory tree with Linux's inotify.
+
+    The watcher blocks in the kernel until something changes, so it uses
+    no CPU while idle.  Directories that appear are watched straight away
+    and everything already inside them is reported as changed, so nothing
+    created in between is missed.
+    """
+
+    def __init__(self, root, suffixes):
+        """Start watching every directory below root."""
+        super().__init__(root, suffixes)
+        import ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._directories = {}
+        self._buffer = b""
+        self._add_tree(self.root)
+
+    def read(self, timeout=None):
+        """Return the paths changed within the timeout in seconds."""
+        import select
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+
+        changes = set()
+        try:
+            data = self._buffer + os.read(self._fd, _read_size)
+        except BlockingIOError:
+            return changes
+
+        offset = 0
+        while offset + _event_header.size <= len(data):
+            wd, mask, _, length = _event_header.unpack_from(data, offset)
+            end = offset + _event_header.size + length
+            if end > len(data):
+                break
+
+            name = data[offset + _event_header.size:end].rstrip(b"\0")
+            offset = end
+            self._handle_event(wd, mask, os.fsdecode(name), changes)
+
+        self._buffer = data[offset:]
+        return changes
+
+    def close(self):
+        """Stop watching and close the inotify instance."""
+        os.close(self._fd)
+
+    def _handle_event(self, wd, mask, name, changes):
+        """Add the paths changed by the given event to changes."""
+        if mask & _IN_Q_OVERFLOW:
+            changes.update(self._add_tree(self.root))
+            return
+
+        directory = self._directories.get(wd)
+        if directory is None:
+            return
+
+        if mask & _IN_IGNORED:
+            del self._directories[wd]
+            return
+
+        path = f"{directory}{os.sep}{name}"
+        if mask & _IN_ISDIR:
+            if self._is_ignored(name):
+                return
+            changes.add(path)
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                changes.update(self._add_tree(path))
+
+        elif name.endswith(self.suffixes):
+            changes.add(path)
+
+    def _add_tree(self, directory):
+        """Watch the directory and those below it and return their paths."""
+        paths = []
+        self._add_watch(directory)
+        for entry in self._walk(directory):
+            paths.append(entry.path)
+            if entry.is_dir(follow_symlinks=False):
+                self._add_watch(entry.path)
+        return paths
+
+    def _add_watch(self, directory):
+        """Watch the given directory."""
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), _IN_MASK,
+        )
+        if wd >= 0:
+            self._directories[wd] = directory
+
+
+class PollingWatcher(_Watcher):
+    """Watches a directory tree by comparing snapshots of it.
+
+    Only reported files are stat'ed, and the tree is not scanned more
+    often than once per interval.
+    """
+
+    def __init__(self, root, suffixes, interval):
+        """Take the first snapshot of the tree below root."""
+        super().__init__(root, suffixes)
+        self.interval = interval
+        self._snapshot = self._get_snapshot()
+
+    def read(self, timeout=None):
+        """Return the paths changed within the timeout in seconds."""
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            sleep(
+                self.interval if deadline is None
+                else max(0, min(self.interval, deadline - monotonic())),
+            )
+            snapshot = self._get_snapshot()
+            changes = {
+                path for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changes or (deadline is not None and monotonic() >= deadline):
+                return changes
+
+    def _get_snapshot(self):
+        """Return the modification time and size of every watched path."""
+        snapshot = {}
+        for entry in self._walk(self.root):
+
+            # Directories are only reported when they appear or disappear
+            if entry.is_dir(follow_symlinks=False):
+                snapshot[entry.path] = ()
+                continue
+
+            try:
+                info = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            snapshot[entry.path] = (info.st_mtime_ns, info.st_size)
+        return snapshot
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def get_watcher(root, suffixes, poll_interval):
+    """Return the most efficient watcher available for the given tree."""
+    if PLATFORM == "linux":
+        try:
+            return InotifyWatcher(root, suffixes)
+        except (AttributeError, OSError):
+            pass
+    return PollingWatcher(root, suffixes, poll_interval)
@@ -0,0 +1,34 @@
+# ../link_verifier.py
+
+"""Finds and repairs dangling links created by the linkers."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Package
+from common.constants import LINK_BASE_DIRECTORY
+from common.functions import clear_screen
+from common.links import link_manifest, print_link_results, verify_links
+from common.servers import supported_games
+
+
+# =============================================================================
+# >> MAIN FUNCTION
+# =============================================================================
+def verify_all_links(*, repair=True):
+    """Verify the links in Source.Python's repository and every server."""
+    roots = [
+        LINK_BASE_DIRECTORY,
+        *(game["directory"] for game in supported_games.values()),
+    ]
+    results = verify_links(roots, link_manifest, repair=repair)
+    print_link_results(results)
+    return results
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    clear_screen()
+    verify_all_links()
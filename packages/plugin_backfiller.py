@@ -0,0 +1,293 @@
+# ../plugin_backfiller.py
+
+"""Rebuilds the release of every past version of a plugin.
+
+The versions are found from the plugin's version tags and from the commits
+that changed its info.ini.  Each version is built from its committed files,
+oldest first so every release can reuse entries from the one before it, and
+plugins are backfilled in parallel.  Versions whose release still has the
+same digest are skipped.  This is used to regenerate old releases after the
+packaging rules have changed, which replaces releases that were already
+published, so existing releases are only rebuilt with --force.
+"""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+import re
+
+# Package
+from common.cli import (
+    add_names_argument,
+    finish_batch,
+    get_names,
+    get_parser,
+    parse_args,
+    run_batch,
+)
+from common.constants import PLUGIN_BASE_PATH, START_DIR
+from common.functions import clear_screen, get_plugin, run_captured
+from common.plugins import plugin_registry
+from common.profiling import add_events, call_profiled, is_enabled, timed
+from common.repository import get_repository
+from plugin_releaser import PluginReleaser, get_release_workers
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the pattern version tags match, such as "v1.2.3" or "1.2.3"
+_version_tag = re.compile(r"v?(\d+\.\d+\.\d+)")
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+@timed("backfiller.find_versions")
+def find_versions(plugin_name):
+    """Return the commit of every released version of the plugin.
+
+    Each version is mapped to the oldest commit whose info.ini has that
+    version, which is the commit the releaser made when it updated the
+    version.  Versions that have a version tag use the tagged commit
+    instead.
+    """
+    repo_path = START_DIR / plugin_name
+    if not (repo_path / ".git").exists():
+        print(f'Plugin "{plugin_name}" is not a git repository.')
+        return {}
+
+    from configobj import ConfigObj
+
+    repository = get_repository(repo_path)
+    versions = {}
+    info_path = "/".join(
+        [*PLUGIN_BASE_PATH.splitall()[1:], plugin_name, "info.ini"],
+    )
+    for commit in repository.get_file_commits(info_path):
+        try:
+            data = repository.read(f"{commit}:{info_path}")
+        except ValueError:
+            continue
+        version = ConfigObj(data.decode().splitlines()).get("version")
+        if version is not None:
+            versions[version] = commit
+
+    # Prefer the commit a version was tagged at
+    for tag, commit in repository.get_tag_commits().items():
+        match = _version_tag.fullmatch(tag)
+        if match is not None:
+            versions[match.group(1)] = commit
+
+    return {
+        version: versions[version]
+        for version in sorted(versions, key=_get_version_key)
+    }
+
+
+@timed("backfiller.backfill_release")
+def backfill_release(plugin_name, commit, *, force=False, workers=None):
+    """Build the release of the plugin from the given commit.
+
+    An existing release whose digest differs is only rebuilt when forced.
+    workers is the number of threads the release is compressed in.
+
+    Returns the version, the zip path and whether the zip was built, or
+    None on failure.
+    """
+    plugin_releaser = PluginReleaser(
+        plugin_name, commit, force=force, workers=workers,
+    )
+    if not (
+        plugin_releaser.validate_ref() and
+        plugin_releaser.validate_version_exists()
+    ):
+        return None
+    built = plugin_releaser.create_release()
+    if built is None:
+        return None
+    return plugin_releaser.version, plugin_releaser.zip_path, built
+
+
+def backfill_plugin(plugin_name, versions, *, force=False, workers=None):
+    """Build the release of each of the plugin's versions in order.
+
+    versions maps each version to its commit, oldest first.  Building them
+    one after another means no two builds of the plugin ever write or read
+    the same release at once.
+
+    force and workers are passed on to backfill_release.
+
+    Returns the commit, release and output of each version.
+    """
+    results = {}
+    try:
+        for version, commit in versions.items():
+            try:
+                release, output = run_captured(
+                    backfill_release, plugin_name, commit, force=force,
+                    workers=workers,
+                )
+            except Exception as error:  # noqa: BLE001
+                release, output = None, f"{error!r}\n"
+            results[version] = (commit, release, output)
+    finally:
+        # Worker processes exit without running atexit handlers
+        get_repository(START_DIR / plugin_name).close()
+    return results
+
+
+def backfill_plugins(plugin_names, *, force=False):
+    """Rebuild every version of the given plugins in worker processes.
+
+    Each plugin is backfilled by one worker, while the plugins themselves
+    are backfilled in parallel, with the CPUs split between the worker
+    processes and their compression threads.  force is passed on to
+    backfill_release.
+
+    Returns the commit, release and output of each version by plugin name
+    and version.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    jobs = {}
+    for plugin_name in plugin_names:
+        jobs[plugin_name] = find_versions(plugin_name)
+        if not jobs[plugin_name]:
+            print(f'Plugin "{plugin_name}" has no versions to backfill.')
+
+    workers = get_release_workers(sum(map(bool, jobs.values())))
+    results = {}
+    with ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(
+                call_profiled, is_enabled(), backfill_plugin,
+                plugin_name, versions, force=force, workers=workers,
+            ): plugin_name
+            for plugin_name, versions in jobs.items()
+            if versions
+        }
+        for future in as_completed(futures):
+            plugin_name = futures[future]
+            try:
+                results[plugin_name], events = future.result()
+            except Exception as error:  # noqa: BLE001
+                results[plugin_name] = {
+                    version: (commit, None, f"{error!r}\n")
+                    for version, commit in jobs[plugin_name].items()
+                }
+            else:
+                add_events(events)
+
+    # Keep the plugins in the order they were given
+    return {plugin_name: results.get(plugin_name, {}) for plugin_name in jobs}
+
+
+def print_backfill_table(results):
+    """Print the status of every backfilled version."""
+    rows = [
+        (plugin_name, version, *_get_status(release, output))
+        for plugin_name, versions in results.items()
+        for version, (_, release, output) in versions.items()
+    ]
+    if not rows:
+        return
+
+    width = max(len("Plugin"), *(len(row[0]) for row in rows))
+    version_width = max(len("Version"), *(len(row[1]) for row in rows))
+    print(
+        f"{'Plugin':<{width}}  {'Version':<{version_width}}  "
+        f"Status     Details",
+    )
+    print(f"{'-' * width}  {'-' * version_width}  ---------  -------")
+    for plugin_name, version, status, details in rows:
+        print(
+            f"{plugin_name:<{width}}  {version:<{version_width}}  "
+            f"{status:<9}  {details}",
+        )
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_version_key(version):
+    """Return the key that sorts the given version numerically."""
+    try:
+        return 0, [int(part) for part in version.split(".")]
+    except ValueError:
+        return 1, version
+
+
+def _get_release_data(commit, release, output):
+    """Return the JSON data of a backfilled version."""
+    return {
+        "commit": commit,
+        "status": _get_status(release, output)[0],
+        "zip_path": None if release is None else release[1],
+        "output": output,
+    }
+
+
+def _get_status(release, output):
+    """Return the status and details of a backfilled version."""
+    if release is None:
+        lines = output.strip().splitlines()
+        return "FAILED", lines[-1] if lines else "Unknown error"
+
+    _, zip_path, built = release
+    return "BUILT" if built else "UNCHANGED", f'"{zip_path}"'
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    add_names_argument(_parser, "plugin", "The plugin(s) to backfill.")
+    _parser.add_argument(
+        "--force", action="store_true",
+        help="Rebuild existing releases whose digest has changed.",
+    )
+    _args = parse_args(_parser)
+
+    # Was the backfiller run in batch mode?
+    if _args.plugins:
+        _results, _output = run_batch(
+            backfill_plugins,
+            get_names(_parser, _args.plugins, plugin_registry, "plugin"),
+            force=_args.force,
+            as_json=_args.json,
+        )
+        if not _args.json:
+            print_backfill_table(_results)
+        finish_batch(
+            {
+                "releases": {
+                    _plugin_name: {
+                        _version: _get_release_data(*_result)
+                        for _version, _result in _versions.items()
+                    }
+                    for _plugin_name, _versions in _results.items()
+                },
+            },
+            _output,
+            as_json=_args.json,
+            failed=any(
+                _release is None
+                for _versions in _results.values()
+                for _, _release, _ in _versions.values()
+            ),
+        )
+
+    # Get the plugin to backfill
+    _plugin_name = get_plugin("backfill")
+    if _plugin_name is not None:
+        clear_screen()
+        print_backfill_table(
+            backfill_plugins(
+                list(plugin_registry) if _plugin_name == "ALL"
+                else [_plugin_name],
+                force=_args.force,
+            ),
+        )
@@ -6,37 +6,265 @@
 # >> IMPORTS
 # =============================================================================
 # Python
-from os import system
+import json
+from collections import Counter
+from datetime import UTC, datetime
+from subprocess import run
 
 # Package
-from common.constants import PLUGIN_BASE_PATH, START_DIR, PLUGIN_LIST
+from common.checker_cache import checker_cache
+from common.cli import (
+    add_names_argument,
+    finish_batch,
+    get_names,
+    get_parser,
+    parse_args,
+    run_batch,
+)
+from common.constants import CHECKER_REPORT_FILE, PLUGIN_BASE_PATH, START_DIR
 from common.functions import clear_screen, get_plugin
+from common.plugins import plugin_registry
+from common.profiling import count, span, timed
 
 
 # =============================================================================
 # >> MAIN FUNCTION
 # =============================================================================
-def check_plugin(plugin_name):
+def check_plugin(plugin_name, *, use_cache=True):
     """Check the given plugin for standards issues."""
-    # Was an invalid plugin name given?
-    if plugin_name not in PLUGIN_LIST:
-        print(f'Invalid plugin name "{plugin_name}"')
-        return
-
-    # Get the plugin's path
-    plugin_path = START_DIR.joinpath(
-        plugin_name,
-        PLUGIN_BASE_PATH,
-        plugin_name,
-    )
+    return check_plugins([plugin_name], use_cache=use_cache)
+
+
+@timed("checker.check_plugins")
+def check_plugins(plugin_names, *, use_cache=True):
+    """Check the given plugins for standards issues with one ruff process.
+
+    Plugins whose result is in the checker cache are not checked again.
+    The diagnostics are split back out per plugin, printed with a summary
+    table and written to the machine-readable report file.
+
+    Returns each plugin's diagnostics, which are None for the plugins ruff
+    failed to check.
+    """
+    plugin_paths = {}
+    for plugin_name in plugin_names:
+
+        # Was an invalid plugin name given?
+        if plugin_name not in plugin_registry:
+            print(f'Invalid plugin name "{plugin_name}"')
+            continue
+
+        # Get the plugin's path
+        plugin_paths[plugin_name] = START_DIR.joinpath(
+            plugin_name,
+            PLUGIN_BASE_PATH,
+            plugin_name,
+        )
+
+    if not plugin_paths:
+        return {}
+
+    ruff_version = get_ruff_version()
+    results = {}
+    cached = set()
+    keys = {}
+    with span("checker.read_cache", plugins=len(plugin_paths)):
+        for plugin_name, plugin_path in plugin_paths.items():
+            if not use_cache or ruff_version is None:
+                results[plugin_name] = []
+                continue
 
-    system(f"ruff check {plugin_path}")
+            keys[plugin_name] = checker_cache.get_key(
+                plugin_path, ruff_version,
+            )
+            diagnostics = checker_cache.get(keys[plugin_name])
+            if diagnostics is None:
+                results[plugin_name] = []
+            else:
+                results[plugin_name] = diagnostics
+                cached.add(plugin_name)
+    count("checker.cache_hits", len(cached))
+
+    unchecked = [
+        plugin_path for plugin_name, plugin_path in plugin_paths.items()
+        if plugin_name not in cached
+    ]
+    if unchecked:
+        diagnostics = None if ruff_version is None else run_ruff(unchecked)
+        if diagnostics is None:
+            for plugin_name in plugin_paths:
+                if plugin_name not in cached:
+                    results[plugin_name] = None
+
+        else:
+            for diagnostic in diagnostics:
+                plugin_name = START_DIR.relpathto(
+                    diagnostic["filename"],
+                ).splitall()[1]
+                results[plugin_name].append(diagnostic)
+
+            # Only store results ruff actually produced
+            if use_cache:
+                with span("checker.write_cache"):
+                    for plugin_name, key in keys.items():
+                        if plugin_name not in cached:
+                            checker_cache.set(key, results[plugin_name])
+                    checker_cache.evict()
+
+    print_diagnostics(results)
+    print_summary(results, cached)
+    with span("checker.write_report"):
+        write_report(results, ruff_version)
+    return results
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+@timed("checker.run_ruff")
+def run_ruff(paths):
+    """Return ruff's JSON diagnostics for all the given paths.
+
+    Returns None if ruff failed, in which case the paths were not checked.
+    """
+    count("spawn.ruff")
+    try:
+        result = run(
+            ["ruff", "check", "--output-format=json", "--exit-zero", *paths],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        print("ruff is not installed.")
+        return None
+
+    if result.returncode:
+        print(f"ruff failed:\n{result.stderr}")
+        return None
+    return json.loads(result.stdout or "[]")
+
+
+@timed("checker.get_ruff_version")
+def get_ruff_version():
+    """Return the version of the installed ruff, or None if it has none."""
+    count("spawn.ruff")
+    try:
+        result = run(
+            ["ruff", "--version"], capture_output=True, text=True, check=False,
+        )
+    except FileNotFoundError:
+        print("ruff is not installed.")
+        return None
+
+    if result.returncode:
+        print(f"ruff failed:\n{result.stderr}")
+        return None
+    return result.stdout.strip()
+
+
+def print_diagnostics(results):
+    """Print each plugin's diagnostics."""
+    for plugin_name, diagnostics in results.items():
+        if not diagnostics:
+            continue
+
+        print(f'Plugin "{plugin_name}":')
+        for diagnostic in diagnostics:
+            location = diagnostic["location"]
+            print(
+                f"\t{START_DIR.relpathto(diagnostic['filename'])}:"
+                f"{location['row']}:{location['column']}: "
+                f"{diagnostic['code']} {diagnostic['message']}",
+            )
+        print()
+
+
+def print_summary(results, cached=()):
+    """Print a table with the number of issues each plugin has."""
+    width = max(len("Plugin"), *map(len, results))
+    print(f"{'Plugin':<{width}}  Issues  Cached  Most common")
+    print(f"{'-' * width}  ------  ------  -----------")
+    for plugin_name, diagnostics in results.items():
+        if diagnostics is None:
+            print(f"{plugin_name:<{width}}  {'FAILED':>6}  {'no':<6}")
+            continue
+
+        codes = Counter(diagnostic["code"] for diagnostic in diagnostics)
+        common = ", ".join(
+            f"{code} ({count})" for code, count in codes.most_common(3)
+        )
+        print(
+            f"{plugin_name:<{width}}  {len(diagnostics):>6}  "
+            f"{'yes' if plugin_name in cached else 'no':<6}  {common}",
+        )
+
+
+def write_report(results, ruff_version):
+    """Write the machine-readable report of the given results."""
+    report = {
+        "generated": datetime.now(UTC).isoformat(),
+        "ruff": ruff_version,
+        "plugins": {
+            plugin_name: (
+                {"failed": True, "issues": None}
+                if diagnostics is None else {
+                    "failed": False,
+                    "issues": len(diagnostics),
+                    "codes": Counter(
+                        diagnostic["code"] for diagnostic in diagnostics
+                    ),
+                    "diagnostics": diagnostics,
+                }
+            )
+            for plugin_name, diagnostics in results.items()
+        },
+    }
+    CHECKER_REPORT_FILE.parent.makedirs_p()
+    CHECKER_REPORT_FILE.write_text(json.dumps(report, indent=2))
 
 
 # =============================================================================
 # >> CALL MAIN FUNCTION
 # =============================================================================
 if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    add_names_argument(_parser, "plugin", "The plugin(s) to check.")
+    _parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Check every plugin again instead of using cached results.",
+    )
+    _args = parse_args(_parser)
+
+    # Was the checker run in batch mode?
+    if _args.plugins:
+        _results, _output = run_batch(
+            check_plugins,
+            get_names(_parser, _args.plugins, plugin_registry, "plugin"),
+            use_cache=not _args.no_cache,
+            as_json=_args.json,
+        )
+        finish_batch(
+            {
+                "plugins": {
+                    _plugin_name: {
+                        "failed": _diagnostics is None,
+                        "issues": (
+                            None if _diagnostics is None
+                            else len(_diagnostics)
+                        ),
+                    }
+                    for _plugin_name, _diagnostics in _results.items()
+                },
+                "report": CHECKER_REPORT_FILE,
+            },
+            _output,
+            as_json=_args.json,
+            failed=any(
+                _diagnostics is None or _diagnostics
+                for _diagnostics in _results.values()
+            ),
+        )
 
     # Get the plugin to check
     _plugin_name = get_plugin("check")
@@ -44,9 +272,7 @@ if __name__ == "__main__":
 
         clear_screen()
         if _plugin_name == "ALL":
-            for _plugin_name in PLUGIN_LIST:
-                print(f'Checking plugin "{_plugin_name}"')
-                check_plugin(_plugin_name)
+            check_plugins(plugin_registry, use_cache=not _args.no_cache)
 
         else:
-            check_plugin(_plugin_name)
+            check_plugin(_plugin_name, use_cache=not _args.no_cache)
@@ -6,8 +6,10 @@
 # >> IMPORTS
 # =============================================================================
 # Package
+from common.cli import finish_batch, get_parser, parse_args, run_batch
 from common.constants import (
     AUTHOR,
+    CACHE_DIR,
     CONFIG_BASE_PATH,
     DATA_BASE_PATH,
     DOCS_BASE_PATH,
@@ -19,12 +21,10 @@ from common.constants import (
     SOUND_BASE_PATH,
     START_DIR,
     TRANSLATIONS_BASE_PATH,
-    PLUGIN_LIST,
 )
 from common.functions import clear_screen
-
-# Site-package
-from jinja2 import Template
+from common.plugins import plugin_registry
+from common.profiling import span, timed
 
 # =============================================================================
 # >> GLOBAL VARIABLES
@@ -44,16 +44,35 @@ _directory_or_file = {
     "3": None,
 }
 
+# Store the values a manifest can give for a file or directory option
+_manifest_directory_or_file = {
+    "file": "file",
+    "directory": "directory",
+    "neither": None,
+    "none": None,
+}
+
+# Store the options a plugin can be created with
+_directory_options = ("config", "docs", "events", "logs", "sound")
+_directory_or_file_options = ("data", "translations")
+
+# Store the template environment once it has been created
+_template_environment = None
+
 
 # =============================================================================
 # >> MAIN FUNCTION
 # =============================================================================
+@timed("creator.create_plugin")
 def create_plugin(plugin_name, **options):
-    """Verify the plugin name and create its base directories/files."""
+    """Verify the plugin name and create its base directories/files.
+
+    Returns whether the plugin was created.
+    """
     # Was no plugin name provided?
     if plugin_name is None:
         print("No plugin name provided.")
-        return
+        return False
 
     # Is the given plugin name valid?
     if not plugin_name.replace("_", "").isalnum():
@@ -62,7 +81,7 @@ def create_plugin(plugin_name, **options):
             "Plugin name must only contain alpha-numeric values and "
             "underscores.",
         )
-        return
+        return False
 
     # Get the path to create the plugin at
     plugin_base_path = START_DIR / plugin_name
@@ -70,7 +89,7 @@ def create_plugin(plugin_name, **options):
     # Has the plugin already been created?
     if plugin_base_path.is_dir():
         print("Plugin already exists.")
-        return
+        return False
 
     # Get the plugin's directory
     plugin_path = plugin_base_path.joinpath(
@@ -81,23 +100,20 @@ def create_plugin(plugin_name, **options):
     # Create the plugin's directory
     plugin_path.makedirs()
 
-    # Copy repo primary files
+    # Render each primary file and write it once
+    with span("creator.load_templates"):
+        environment = _get_template_environment()
     for file in PLUGIN_PRIMARY_FILES_DIR.files():
-        file.copy(
-            plugin_path / file.name,
-        )
-        with file.open() as open_file:
-            file_contents = Template(open_file.read())
-
-        file_contents = file_contents.render(
-            plugin_name=plugin_name,
-            author=AUTHOR,
-        )
-        if not file_contents.endswith('\n'):
-            file_contents += '\n'
+        with span("creator.render", file=str(file.name)):
+            file_contents = environment.get_template(str(file.name)).render(
+                plugin_name=plugin_name,
+                author=AUTHOR,
+            )
+        if not file_contents.endswith("\n"):
+            file_contents += "\n"
         new_file = plugin_path / file.name
-        with new_file.open("w") as open_file:
-            open_file.write(file_contents)
+        new_file.write_text(file_contents)
+        file.copymode(new_file)
 
     for option, path in (
         ("config", CONFIG_BASE_PATH),
@@ -133,10 +149,104 @@ def create_plugin(plugin_name, **options):
             plugin_base_path / file.name,
         )
 
+    return True
+
+
+def create_plugins_from_manifest(manifest_path):
+    """Create every plugin listed in the given INI manifest.
+
+    Each section of the manifest is a plugin name, and its values are the
+    directory options to create the plugin with, for example::
+
+        [my_plugin]
+        config = yes
+        data = file
+        translations = directory
+
+    Returns whether each plugin was created.
+    """
+    # Import configobj only when it is needed
+    from configobj import ConfigObj
+
+    results = {}
+    manifest = ConfigObj(manifest_path)
+    for plugin_name, values in manifest.items():
+        options = _get_manifest_options(plugin_name, values)
+        if options is None:
+            results[plugin_name] = False
+            continue
+
+        print(f'Creating plugin "{plugin_name}".')
+        results[plugin_name] = create_plugin(plugin_name, **options)
+    return results
+
+
+def create_plugins(plugin_names, **options):
+    """Create every given plugin with the same directory options.
+
+    Returns whether each plugin was created.
+    """
+    results = {}
+    for plugin_name in plugin_names:
+        print(f'Creating plugin "{plugin_name}".')
+        results[plugin_name] = create_plugin(plugin_name, **options)
+    return results
+
 
 # =============================================================================
 # >> HELPER FUNCTIONS
 # =============================================================================
+def _get_template_environment():
+    """Return the environment the primary files are rendered with.
+
+    The environment is only created once, and compiled templates are
+    stored in the cache directory so later runs do not compile them again.
+    """
+    global _template_environment  # noqa: PLW0603
+    if _template_environment is None:
+
+        # Import jinja2 only when it is needed, as it is slow to import
+        from jinja2 import (
+            Environment,
+            FileSystemBytecodeCache,
+            FileSystemLoader,
+        )
+
+        bytecode_directory = CACHE_DIR / "jinja"
+        bytecode_directory.makedirs_p()
+        _template_environment = Environment(
+            loader=FileSystemLoader(PLUGIN_PRIMARY_FILES_DIR),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_directory),
+        )
+    return _template_environment
+
+
+def _get_manifest_options(plugin_name, values):
+    """Return the directory options for a plugin in the manifest."""
+    for option in set(values) - {
+        *_directory_options, *_directory_or_file_options,
+    }:
+        print(f'Unknown option "{option}" for "{plugin_name}".')
+        return None
+
+    options = {}
+    for option in _directory_options:
+        value = str(values.get(option, "no")).lower()
+        if value not in _boolean_values:
+            print(f'Invalid value "{value}" for "{option}" of "{plugin_name}".')
+            return None
+        options[option] = _boolean_values[value]
+
+    for option in _directory_or_file_options:
+        value = str(values.get(option, "neither")).lower()
+        if value not in _manifest_directory_or_file:
+            print(f'Invalid value "{value}" for "{option}" of "{plugin_name}".')
+            return None
+        options[option] = _manifest_directory_or_file[value]
+
+    return options
+
+
 def _create_directory(base_path, *args, filename):
     """Create the directory using the given arguments."""
     current_path = base_path.joinpath(*args)
@@ -160,7 +270,7 @@ def _get_plugin_name():
         )
 
     # Does the plugin already exist?
-    if name in PLUGIN_LIST:
+    if name in plugin_registry:
         return _ask_retry(f'Plugin name "{name}" already exists.')
 
     return name
@@ -219,6 +329,62 @@ def _get_directory_or_file(name):
 # >> CALL MAIN FUNCTION
 # =============================================================================
 if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    _parser.add_argument(
+        "--plugin", action="extend", nargs="+", dest="plugins",
+        metavar="NAME", help="The plugin(s) to create.",
+    )
+    _parser.add_argument(
+        "--manifest",
+        help="Create every plugin listed in the given INI manifest.",
+    )
+    for _option in _directory_options:
+        _parser.add_argument(
+            f"--{_option}", action="store_true",
+            help=f"Include a {_option} directory (with --plugin).",
+        )
+    for _option in _directory_or_file_options:
+        _parser.add_argument(
+            f"--{_option}", choices=sorted(_manifest_directory_or_file),
+            default="neither",
+            help=f"Include a {_option} file or directory (with --plugin).",
+        )
+    _args = parse_args(_parser)
+
+    # Was the creator run in batch mode?
+    if _args.plugins or _args.manifest is not None:
+        _results = {}
+        _output = ""
+        if _args.manifest is not None:
+            _results, _output = run_batch(
+                create_plugins_from_manifest,
+                _args.manifest,
+                as_json=_args.json,
+            )
+        if _args.plugins:
+            _plugin_results, _plugin_output = run_batch(
+                create_plugins,
+                _args.plugins,
+                **{
+                    _option: getattr(_args, _option)
+                    for _option in _directory_options
+                },
+                **{
+                    _option: _manifest_directory_or_file[
+                        getattr(_args, _option)
+                    ]
+                    for _option in _directory_or_file_options
+                },
+                as_json=_args.json,
+            )
+            _results.update(_plugin_results)
+            _output += _plugin_output
+        finish_batch(
+            {"plugins": _results},
+            _output,
+            as_json=_args.json,
+            failed=not all(_results.values()),
+        )
 
     _plugin_name = _get_plugin_name()
 
@@ -6,68 +6,105 @@
 # >> IMPORTS
 # =============================================================================
 # Package
-from common.constants import (
-    CONFIG_BASE_PATH,
-    DATA_BASE_PATH,
-    DOCS_BASE_PATH,
-    EVENTS_BASE_PATH,
-    LINK_BASE_DIRECTORY,
-    LOGS_BASE_PATH,
-    PLUGIN_BASE_PATH,
-    SOUND_BASE_PATH,
-    START_DIR,
-    TRANSLATIONS_BASE_PATH,
-    PLUGIN_LIST,
+from common.cli import (
+    add_names_argument,
+    finish_batch,
+    get_names,
+    get_parser,
+    parse_args,
+    run_batch,
 )
-from common.functions import clear_screen, get_plugin, link_directory, link_file
+from common.constants import LINK_BASE_DIRECTORY, START_DIR
+from common.functions import clear_screen, get_plugin
+from common.links import (
+    apply_links,
+    link_manifest,
+    plan_links,
+    print_link_results,
+)
+from common.plugins import base_paths, plugin_registry
+from common.profiling import timed
 
 
 # =============================================================================
 # >> MAIN FUNCTION
 # =============================================================================
-def link_plugin(plugin_name):
+def link_plugin(plugin_name, *, dry_run=False):
     """Link the given plugin name to Source.Python's repository."""
-    for path in (
-        CONFIG_BASE_PATH,
-        DATA_BASE_PATH,
-        DOCS_BASE_PATH,
-        EVENTS_BASE_PATH,
-        LOGS_BASE_PATH,
-        PLUGIN_BASE_PATH,
-        SOUND_BASE_PATH,
-        TRANSLATIONS_BASE_PATH,
-    ):
-        _link_directory_or_files(
-            plugin_name,
-            path,
-        )
+    return link_plugins([plugin_name], dry_run=dry_run)
+
+
+@timed("linker.link_plugins")
+def link_plugins(plugin_names, *, dry_run=False):
+    """Link all the given plugins in one batch and print the results."""
+    results = apply_links(
+        plan_links(
+            (
+                link
+                for plugin_name in plugin_names
+                for link in get_plugin_links(plugin_name)
+            ),
+            link_manifest,
+        ),
+        dry_run=dry_run,
+        manifest=link_manifest,
+    )
+    print_link_results(results, verbose=dry_run)
+    return results
+
+
+def get_plugin_links(plugin_name):
+    """Return the (src, dest, kind) links the given plugin needs."""
+    links = []
+    for path in base_paths:
+        links.extend(_get_directory_or_file_links(plugin_name, path))
+    return links
 
 
 # =============================================================================
 # >> HELPER FUNCTIONS
 # =============================================================================
-def _link_directory_or_files(plugin_name, *args):
-    """Link the directory using the given arguments."""
+def _get_directory_or_file_links(plugin_name, *args):
+    """Return the directory and .ini file links for the given arguments."""
     plugin_path = START_DIR / plugin_name
     src = plugin_path.joinpath(*args, plugin_name)
+    dest = LINK_BASE_DIRECTORY.joinpath(*args, plugin_name)
 
     # Link the directory?
     if src.is_dir():
-        dest = LINK_BASE_DIRECTORY.joinpath(*args, plugin_name)
-        if not dest.is_dir():
-            link_directory(src, dest)
+        yield src, dest, "directory"
 
-    src += '.ini'
-    if src.is_file():
-        dest = LINK_BASE_DIRECTORY.joinpath(*args, plugin_name) + '.ini'
-        if not dest.is_file():
-            link_file(src, dest)
+    # Link the .ini file?
+    if (src + ".ini").is_file():
+        yield src + ".ini", dest + ".ini", "file"
 
 
 # =============================================================================
 # >> CALL MAIN FUNCTION
 # =============================================================================
 if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    add_names_argument(_parser, "plugin", "The plugin(s) to link.")
+    _parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Only show what would be linked (batch mode only).",
+    )
+    _args = parse_args(_parser)
+
+    # Was the linker run in batch mode?
+    if _args.plugins:
+        _results, _output = run_batch(
+            link_plugins,
+            get_names(_parser, _args.plugins, plugin_registry, "plugin"),
+            dry_run=_args.dry_run,
+            as_json=_args.json,
+        )
+        finish_batch(
+            {"links": [_result.as_dict() for _result in _results]},
+            _output,
+            as_json=_args.json,
+            failed=any(_result.failed for _result in _results),
+        )
 
     _plugin_name = get_plugin("link")
 
@@ -75,7 +112,6 @@ if __name__ == "__main__":
     if _plugin_name is not None:
         clear_screen()
         if _plugin_name == "ALL":
-            for _plugin_name in PLUGIN_LIST:
-                link_plugin(_plugin_name)
+            link_plugins(plugin_registry)
         else:
             link_plugin(_plugin_name)
@@ -6,25 +6,49 @@
 # >> IMPORTS
 # =============================================================================
 # Python
-from contextlib import suppress
-from os import sep
-from zipfile import ZIP_DEFLATED, ZipFile
+import json
+import os
+from subprocess import CalledProcessError
 
 # Package
+from common.archive import (
+    CompressionPolicy,
+    ObjectSource,
+    ReleaseArchive,
+    get_release_digest,
+)
+from common.cli import (
+    add_names_argument,
+    finish_batch,
+    get_names,
+    get_parser,
+    parse_args,
+)
 from common.constants import (
-    ALLOWED_FILETYPES,
-    EXCEPTION_FILETYPES,
     PLUGIN_BASE_PATH,
+    RELEASE_COMPRESSION,
     RELEASE_DIR,
+    RELEASE_MAX_COMPRESSION_FILETYPES,
+    RELEASE_PENDING_SIZE,
+    RELEASE_STORED_FILETYPES,
+    RELEASE_WORKERS,
     SEMANTIC_VERSIONING_COUNT,
     START_DIR,
 )
-from common.functions import clear_screen, get_plugin
-
-# Site-package
-from configobj import ConfigObj
-from git import Repo
-from git.exc import InvalidGitRepositoryError
+from common.filetypes import (
+    OUTSIDE_ALLOWED_DIRECTORIES,
+    release_file_classifier,
+)
+from common.functions import clear_screen, get_plugin, run_captured
+from common.plugins import plugin_registry
+from common.profiling import (
+    add_events,
+    call_profiled,
+    is_enabled,
+    span,
+    timed,
+)
+from common.repository import get_first_change, get_repository
 
 
 # =============================================================================
@@ -37,6 +61,25 @@ _version_updates = {
     4: None,
 }
 
+# Store the version update types by their command line name
+_update_type_names = {
+    (name or "none").lower(): update_type
+    for update_type, name in _version_updates.items()
+}
+
+# Store how the result of each push is shown in the release table
+_push_statuses = {
+    None: "-",
+    True: "OK",
+    False: "FAILED",
+}
+
+_compression_policy = CompressionPolicy(
+    compression=RELEASE_COMPRESSION,
+    stored=RELEASE_STORED_FILETYPES,
+    maximum=RELEASE_MAX_COMPRESSION_FILETYPES,
+)
+
 
 # =============================================================================
 # >> CLASSES
@@ -49,29 +92,64 @@ class PluginReleaser:
     check_version = None
     update_type = None
     zip_path = None
+    commit = None
+    blob_ids = None
+    push_process = None
 
-    def __init__(self, plugin_name):
+    def __init__(self, plugin_name, ref=None, *, force=False, workers=None):
         self.plugin_name = plugin_name
         self.plugin_repo_path = START_DIR / self.plugin_name
+        self.ref = ref
+        self.force = force
+        self.workers = get_release_workers() if workers is None else workers
+        self.repository = get_repository(self.plugin_repo_path)
 
+    @timed("releaser.validate_diff")
     def validate_diff(self):
         """Validate that the plugin does not have uncommitted changes."""
+        self.plugin_repo = self.repository.get_repo()
+        if self.plugin_repo is None:
+            print(f'Plugin "{self.plugin_name}" is not a git repository.')
+            return False
+
         try:
-            self.plugin_repo = Repo(START_DIR / self.plugin_name)
-        except InvalidGitRepositoryError:
+            with span("git.status"):
+                change = get_first_change(self.plugin_repo_path)
+        except CalledProcessError as error:
+            print(
+                f'Plugin "{self.plugin_name}" could not be checked for '
+                f"uncommitted changes (git status exited with "
+                f"{error.returncode}).",
+            )
+            return False
+
+        if change is not None:
+            print(
+                f'Plugin "{self.plugin_name}" has uncommitted changes '
+                f'("{change}").',
+            )
+            return False
+
+        return True
+
+    @timed("releaser.validate_ref")
+    def validate_ref(self):
+        """Validate that the ref exists and list the files it contains."""
+        if not (self.plugin_repo_path / ".git").exists():
             print(f'Plugin "{self.plugin_name}" is not a git repository.')
             return False
 
-        if (
-                bool(self.plugin_repo.index.diff('HEAD')) or
-                bool(self.plugin_repo.index.diff(None)) or
-                bool(self.plugin_repo.untracked_files)
-        ):
-            print(f'Plugin "{self.plugin_name}" has uncommitted changes.')
+        with span("git.rev_parse"):
+            self.commit = self.repository.resolve_commit(self.ref)
+        if self.commit is None:
+            print(f'Plugin "{self.plugin_name}" has no commit "{self.ref}".')
             return False
 
+        with span("git.ls_tree"):
+            self.blob_ids = self.repository.get_tree_entries(self.commit)
         return True
 
+    @timed("releaser.validate_version_exists")
     def validate_version_exists(self):
         """Find if we need to update the version."""
         self.info_file = self.plugin_repo_path.joinpath(
@@ -79,11 +157,28 @@ class PluginReleaser:
             self.plugin_name,
             "info.ini",
         )
-        if not self.info_file.is_file():
-            print("No info.ini file found")
-            return False
+        from configobj import ConfigObj
+
+        # Is the release being built from the working tree?
+        if self.blob_ids is None:
+            if not self.info_file.is_file():
+                print("No info.ini file found")
+                return False
+            self.info = ConfigObj(self.info_file)
+
+        else:
+            info_id = self.blob_ids.get(
+                self.info_file.relpath(self.plugin_repo_path).replace(
+                    "\\", "/",
+                ),
+            )
+            if info_id is None:
+                print("No info.ini file found")
+                return False
+            self.info = ConfigObj(
+                self.repository.read(info_id).decode().splitlines(),
+            )
 
-        self.info = ConfigObj(self.info_file)
         self.version = self.info.get("version")
         if self.version is None:
             print('"version" not found in info.ini')
@@ -101,8 +196,12 @@ class PluginReleaser:
 
         return True
 
-    def find_new_version(self):
-        self.update_type = self.get_version_update_type()
+    def find_new_version(self, update_type=None):
+        """Bump the version using the given or requested update type."""
+        self.update_type = (
+            self.get_version_update_type() if update_type is None
+            else update_type
+        )
         if self.update_type <= SEMANTIC_VERSIONING_COUNT:
             self.check_version[self.update_type - 1] += 1
             self.check_version[self.update_type:] = [0] * (3 - self.update_type)
@@ -116,7 +215,10 @@ class PluginReleaser:
         if previous is not None:
             message += f'Invalid value given "{previous}"\n\n'
 
-        message += "Which type of version update should this be?\n\n"
+        message += (
+            f"Which type of version update should {self.plugin_name} "
+            f"receive?\n\n"
+        )
         for number, choice in sorted(_version_updates.items()):
             message += f"\t({number}) {choice}\n"
 
@@ -130,100 +232,432 @@ class PluginReleaser:
 
         return value
 
+    @timed("releaser.commit_update")
     def commit_update(self):
+        """Commit the new version and build the release from that commit."""
         self.version = self.info["version"] = ".".join(
             map(str, self.check_version)
         )
         self.info.write()
-        self.plugin_repo.index.add([
-            self.info_file.filename.replace(self.plugin_repo_path, "")[1:]
-        ])
-        self.plugin_repo.index.commit(
-            f"{_version_updates[self.update_type]} version"
-            f" update ({self.version})"
-        )
-        self.plugin_repo.remotes.origin.push()
+        with span("git.commit"):
+            self.plugin_repo.index.add([
+                self.info_file.relpath(self.plugin_repo_path),
+            ])
+            self.commit = self.plugin_repo.index.commit(
+                f"{_version_updates[self.update_type]} version"
+                f" update ({self.version})"
+            ).hexsha
+        with span("git.ls_tree"):
+            self.blob_ids = self.repository.get_tree_entries(self.commit)
+
+    def start_push(self):
+        """Start pushing the commit while the release is built."""
+        with span("git.push_start"):
+            self.push_process = self.repository.start_push()
+
+    @timed("releaser.finish_push")
+    def finish_push(self):
+        """Wait for the push and mark the release if it failed.
+
+        A release whose commit could not be pushed is kept, and a
+        ".unpushed" file with git's output is written next to it.
+
+        Returns whether the push succeeded, or None if nothing was pushed.
+        """
+        if self.push_process is None:
+            return None
+
+        output = self.push_process.communicate()[0].decode(
+            "utf-8", "replace",
+        ).strip()
+        failed = self.push_process.returncode
+        self.push_process = None
+
+        marker = None if self.zip_path is None else self.zip_path + ".unpushed"
+        if not failed:
+            if marker is not None:
+                marker.remove_p()
+            return True
+
+        print(f"Push failed:\n{output}")
+        if marker is not None:
+            marker.write_text(f"{output}\n")
+            print(f'Release marked as unpushed: "{marker}".')
+        return False
 
+    @timed("releaser.create_release")
     def create_release(self):
-        """Verify the plugin name and create the current release."""
+        """Verify the plugin name and create the current release.
+
+        Returns whether the zip was built, which it is not when the release
+        already exists with the same digest.  A release that exists with a
+        different or no digest is only rebuilt when forced, and None is
+        returned otherwise.
+        """
         # Get the directory to save the release in
         save_path = RELEASE_DIR / self.plugin_name
 
         # Create the directory if it doesn't exist
-        if not save_path.is_dir():
-            save_path.makedirs()
+        save_path.makedirs_p()
 
         # Get the zip file location
         self.zip_path = save_path / f"{self.plugin_name} - v{self.version}.zip"
+        digest_path = self.zip_path + ".digest"
+
+        blob_ids = self.blob_ids
+        if blob_ids is None:
+            with span("git.ls_files"):
+                blob_ids = self.repository.get_index_entries()
+        with span("releaser.classify_files", files=len(blob_ids)):
+            repo_files = self.get_release_files(list(blob_ids))
+        digest = get_release_digest(repo_files, blob_ids, _compression_policy)
 
-        # Does the release already exist?
+        # Was the release already built from the same files?
         if self.zip_path.is_file():
-            print("Release already exists for current version.")
-            return
+            previous_digest, previous_policy = _read_digest_file(digest_path)
+            if previous_digest == digest:
+                print("Release already exists for current version.")
+                if (self.zip_path + ".unpushed").is_file():
+                    print("Its commit has not been pushed yet.")
+                return False
+
+            reason = _get_change_reason(
+                previous_digest, previous_policy, repo_files, blob_ids,
+            )
+            if not self.force:
+                print(
+                    f"Release exists for current version but {reason}.  "
+                    f"Use --force to rebuild it.",
+                )
+                return None
 
-        repo_files = self.plugin_repo.git.ls_files().splitlines()
+            print(
+                f"Release exists for current version but {reason}.  "
+                f"Rebuilding it.",
+            )
 
-        # Create the zip file
-        with ZipFile(self.zip_path, "w", ZIP_DEFLATED) as zip_file:
+        # Create the zip file, reusing entries from the previous release
+        with span("releaser.find_previous_release"):
+            previous_zip_path = self.get_previous_release()
+        previous_policy = None
+        if previous_zip_path is not None:
+            previous_policy = _read_digest_file(
+                previous_zip_path + ".digest",
+            )[1]
+        archive = ReleaseArchive(
+            self.zip_path,
+            (
+                self.plugin_repo_path if self.blob_ids is None
+                else ObjectSource(self.repository, blob_ids)
+            ),
+            previous_zip_path,
+            _compression_policy,
+            previous_policy=previous_policy,
+            workers=self.workers,
+            max_pending=RELEASE_PENDING_SIZE,
+        )
+        with span("archive.build", plugin=self.plugin_name):
+            archive.build(repo_files)
+        digest_path.write_text(json.dumps({
+            "digest": digest,
+            "policy": _compression_policy.get_data(),
+        }))
+        if archive.reused:
+            print(
+                f"Reused {archive.reused} unchanged file(s) from "
+                f'"{previous_zip_path.name}".',
+            )
+        archive.print_statistics()
+        return True
 
-            for repo_file in repo_files:
-                if self.validate_file_by_base_path(repo_file):
-                    self.add_file(repo_file, zip_file)
+    def get_previous_release(self):
+        """Return the most recent release zip older than the current version."""
+        previous_zip_path = previous_version = None
+        prefix = f"{self.plugin_name} - v"
+        for zip_path in self.zip_path.parent.files(f"{prefix}*.zip"):
+            try:
+                version = [
+                    int(x) for x in zip_path.stem[len(prefix):].split(".")
+                ]
+            except ValueError:
+                continue
+
+            if version >= self.check_version:
+                continue
+
+            if previous_version is None or version > previous_version:
+                previous_zip_path, previous_version = zip_path, version
+
+        return previous_zip_path
 
     @staticmethod
-    def validate_file_by_base_path(file):
-        for allowed_path in ALLOWED_FILETYPES:
-            if file.startswith(allowed_path):
-                if (
-                    allowed_path in EXCEPTION_FILETYPES and
-                    file.endswith(*EXCEPTION_FILETYPES[allowed_path])
-                ):
-                    return False
-                return True
-        return False
+    def get_release_files(files):
+        """Return the given files that are allowed in a release."""
+        classification = release_file_classifier.classify(files)
 
-    def add_file(self, relative_file_path, zip_file):
-        """Add the given file and all parent directories to the zip."""
-        full_file_path = self.plugin_repo_path / relative_file_path
-        zip_file.write(full_file_path, relative_file_path)
-        directory = full_file_path.parent
+        # Report the files that are skipped inside an allowed directory
+        for file in classification.rejected:
+            rule = classification.rules[file]
+            if rule != OUTSIDE_ALLOWED_DIRECTORIES:
+                print(f'Skipping "{file}": {rule}.')
 
-        # Get all parent directories to add to the zip
-        while directory != self.plugin_repo_path:
+        return classification.accepted
 
-            # Is the current directory not yet included in the zip?
-            current = directory.replace(
-                self.plugin_repo_path,
-                "",
-            )[1:].replace("\\", "/") + "/"
-            if current not in zip_file.namelist():
-                zip_file.write(directory, current)
 
-            directory = directory.parent
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+@timed("releaser.release_plugin")
+def release_plugin(
+    plugin_name, update_type=None, ref=None, *, force=False, workers=None,
+):
+    """Validate, version and create the release for the given plugin.
+
+    With a ref, the release is built from the files of that commit or tag
+    straight from the git objects.  The working tree is then neither
+    checked nor read, and the version is not updated.
+
+    When the version is updated, the new commit is pushed in the
+    background while the release is built from it.  An existing release
+    whose files differ is only rebuilt when forced.  workers is the number
+    of threads the release is compressed in.
+
+    Returns the released version, the zip path and whether the push
+    succeeded (None if nothing was pushed), or None on failure.
+    """
+    plugin_releaser = PluginReleaser(
+        plugin_name, ref, force=force, workers=workers,
+    )
+    try:
+        if not (
+            (
+                plugin_releaser.validate_diff() if ref is None
+                else plugin_releaser.validate_ref()
+            ) and
+            plugin_releaser.validate_version_exists()
+        ):
+            return None
+
+        if ref is None and plugin_releaser.find_new_version(update_type):
+            plugin_releaser.commit_update()
+            plugin_releaser.start_push()
+        try:
+            built = plugin_releaser.create_release()
+        finally:
+            pushed = plugin_releaser.finish_push()
+    finally:
+        # Worker processes exit without running atexit handlers
+        plugin_releaser.repository.close()
+    if built is None:
+        return None
+    return plugin_releaser.version, plugin_releaser.zip_path, pushed
+
+
+def release_plugins(update_types, ref=None, *, force=False):
+    """Release the given plugins concurrently in worker processes.
+
+    update_types maps each plugin name to its already chosen version update
+    type, so that no worker ever has to ask for input.  ref and force are
+    passed on to release_plugin, and the CPUs are split between the worker
+    processes and their compression threads.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = get_release_workers(len(update_types))
+    results = {}
+    with ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(
+                call_profiled, is_enabled(), run_captured, release_plugin,
+                plugin_name, update_type, ref, force=force, workers=workers,
+            ): plugin_name
+            for plugin_name, update_type in update_types.items()
+        }
+        for future in as_completed(futures):
+            plugin_name = futures[future]
+            try:
+                (release, output), events = future.result()
+            except Exception as error:  # noqa: BLE001
+                release, output = None, f"{error!r}\n"
+            else:
+                add_events(events)
+            results[plugin_name] = (release, output)
+
+    return results
+
+
+def get_release_workers(release_count=1):
+    """Return the number of threads each release is compressed in.
+
+    Unless RELEASE_WORKERS is set, the CPUs are split between the given
+    number of releases being built at once, one process per CPU at most.
+    """
+    if RELEASE_WORKERS is not None:
+        return RELEASE_WORKERS
+
+    cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // min(cpu_count, max(1, release_count)))
+
+
+def print_release_table(results):
+    """Print one combined success/failure table for the given results."""
+    width = max(len("Plugin"), *map(len, results))
+    print(f"{'Plugin':<{width}}  Build   Push    Details")
+    print(f"{'-' * width}  ------  ------  -------")
+    for plugin_name, (release, output) in sorted(results.items()):
+        if release is None:
+            build, push = "FAILED", "-"
+            lines = output.strip().splitlines()
+            details = lines[-1] if lines else "Unknown error"
+        else:
+            version, zip_path, pushed = release
+            build = "OK"
+            push = _push_statuses[pushed]
+            details = f'v{version} "{zip_path}"'
+        print(f"{plugin_name:<{width}}  {build:<6}  {push:<6}  {details}")
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _read_digest_file(digest_path):
+    """Return the digest and compression policy a release was built with.
+
+    Either is None if it was not recorded.  Older digest files only hold
+    the digest itself.
+    """
+    if not digest_path.is_file():
+        return None, None
+
+    text = digest_path.read_text()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return text, None
+
+    # Treat a missing key like a digest or policy that was not recorded
+    policy = data.get("policy")
+    if policy is not None:
+        policy = CompressionPolicy.from_data(policy)
+    return data.get("digest"), policy
+
+
+def _get_change_reason(previous_digest, previous_policy, files, blob_ids):
+    """Return why a release's digest differs from its recorded digest."""
+    if previous_digest is None:
+        return "has no digest"
+
+    # Older digest files do not record the policy they were built with
+    if previous_policy is None:
+        return "its files or compression policy have changed"
+
+    # Was the release built from different files?
+    files_changed = previous_digest != get_release_digest(
+        files, blob_ids, previous_policy,
+    )
+    policy_changed = previous_policy.signature != _compression_policy.signature
+    if files_changed and policy_changed:
+        return "its files and compression policy have changed"
+    if policy_changed:
+        return "its compression policy has changed"
+    return "its files have changed"
 
 
 # =============================================================================
 # >> CALL MAIN FUNCTION
 # =============================================================================
 if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    add_names_argument(_parser, "plugin", "The plugin(s) to release.")
+    _parser.add_argument(
+        "--update-type", choices=list(_update_type_names),
+        help="The version update every plugin receives (batch mode only).",
+    )
+    _parser.add_argument(
+        "--ref",
+        help=(
+            "Release the given commit or tag from the git objects instead of "
+            "the working tree, without updating the version."
+        ),
+    )
+    _parser.add_argument(
+        "--force", action="store_true",
+        help=(
+            "Rebuild existing releases whose files differ from the ones "
+            "being released."
+        ),
+    )
+    _args = parse_args(_parser)
+    if _args.ref is not None and _args.update_type not in (None, "none"):
+        _parser.error("--update-type cannot be used with --ref")
+
+    # Was the releaser run in batch mode?
+    if _args.plugins:
+        if _args.update_type is None and _args.ref is None:
+            _parser.error("--update-type is required with --plugin")
+
+        _results = release_plugins(
+            dict.fromkeys(
+                get_names(_parser, _args.plugins, plugin_registry, "plugin"),
+                _update_type_names[_args.update_type or "none"],
+            ),
+            _args.ref,
+            force=_args.force,
+        )
+        if not _args.json:
+            print_release_table(_results)
+        finish_batch(
+            {
+                "releases": {
+                    _plugin_name: {
+                        "version": None if _release is None else _release[0],
+                        "zip_path": None if _release is None else _release[1],
+                        "pushed": None if _release is None else _release[2],
+                        "output": _release_output,
+                    }
+                    for _plugin_name, (_release, _release_output)
+                    in sorted(_results.items())
+                },
+            },
+            "",
+            as_json=_args.json,
+            failed=any(
+                _release is None or _release[2] is False
+                for _release, _ in _results.values()
+            ),
+        )
 
-    # Get the plugin to check
-    _plugin_name = get_plugin(suffix="release", allow_all=False)
+    # Get the plugin to release
+    _plugin_name = get_plugin(suffix="release")
+
+    # Was ALL chosen?
+    if _plugin_name == "ALL":
+
+        # Ask for every version update before any work is started
+        _update_types = {
+            _plugin_name: (
+                _update_type_names["none"] if _args.ref is not None
+                else PluginReleaser(_plugin_name).get_version_update_type()
+            )
+            for _plugin_name in plugin_registry
+        }
+        clear_screen()
+        print_release_table(
+            release_plugins(_update_types, _args.ref, force=_args.force),
+        )
 
     # Was a valid plugin chosen?
-    if _plugin_name is not None:
+    elif _plugin_name is not None:
         clear_screen()
 
-        plugin_releaser = PluginReleaser(_plugin_name)
-        if (
-            plugin_releaser.validate_diff() and
-            plugin_releaser.validate_version_exists()
-        ):
-            if plugin_releaser.find_new_version():
-                plugin_releaser.commit_update()
-            plugin_releaser.create_release()
+        _release = release_plugin(
+            _plugin_name, ref=_args.ref, force=_args.force,
+        )
+        if _release is not None:
             print(
-                f"Successfully created {plugin_releaser.plugin_name} version"
-                f" {plugin_releaser.version} release:\n\t"
-                f'"{plugin_releaser.zip_path}"\n\n'
+                f"Successfully created {_plugin_name} version"
+                f" {_release[0]} release:\n\t"
+                f'"{_release[1]}"\n\n'
             )
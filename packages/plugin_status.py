@@ -0,0 +1,58 @@
+# ../plugin_status.py
+
+"""Reports which plugin repositories have uncommitted changes."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Package
+from common.constants import START_DIR
+from common.functions import clear_screen
+from common.plugins import plugin_registry
+from common.repository import get_repository_statuses
+
+
+# =============================================================================
+# >> MAIN FUNCTION
+# =============================================================================
+def print_plugin_statuses():
+    """Print each plugin's version and whether its repository is dirty."""
+    if not plugin_registry:
+        print("There are no plugins to check.")
+        return
+
+    # Only query the plugins the registry found to be repositories
+    all_metadata = plugin_registry.get_all_metadata()
+    statuses = {
+        status.plugin_name: status
+        for status in get_repository_statuses({
+            metadata.name: START_DIR / metadata.name
+            for metadata in all_metadata if metadata.is_repository
+        })
+    }
+
+    width = max(len("Plugin"), *map(len, plugin_registry))
+    version_width = max(
+        len("Version"),
+        *(len(metadata.version or "-") for metadata in all_metadata),
+    )
+    print(f"{'Plugin':<{width}}  {'Version':<{version_width}}  Status")
+    print(f"{'-' * width}  {'-' * version_width}  ------")
+    for metadata in all_metadata:
+        status = statuses.get(metadata.name)
+        if status is None or not status.is_repository:
+            state = "not a git repository"
+        elif status.dirty:
+            state = f'dirty ("{status.change}")'
+        else:
+            state = "clean"
+        version = metadata.version or "-"
+        print(f"{metadata.name:<{width}}  {version:<{version_width}}  {state}")
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    clear_screen()
+    print_plugin_statuses()
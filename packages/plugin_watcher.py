@@ -0,0 +1,126 @@
+# ../plugin_watcher.py
+
+"""Keeps plugin links and checks current while plugins are being edited."""
+
+# =============================================================================
+# >> IMPORTS
+# =============================================================================
+# Python
+from subprocess import run
+
+# Package
+from common.constants import (
+    LINK_BASE_DIRECTORY,
+    PLUGIN_BASE_PATH,
+    START_DIR,
+    WATCH_DEBOUNCE,
+    WATCH_POLL_INTERVAL,
+)
+from common.functions import clear_screen
+from common.links import (
+    apply_links,
+    link_manifest,
+    plan_links,
+    print_link_results,
+)
+from common.plugins import base_paths, plugin_registry
+from common.watcher import get_watcher
+
+# Site-Package
+from path import Path
+
+
+# =============================================================================
+# >> GLOBAL VARIABLES
+# =============================================================================
+# Store the directory names of each base path to match changed paths against
+_base_path_parts = {
+    tuple(base_path.splitall()[1:]): base_path for base_path in base_paths
+}
+_plugin_base_path_parts = tuple(PLUGIN_BASE_PATH.splitall()[1:])
+
+
+# =============================================================================
+# >> MAIN FUNCTION
+# =============================================================================
+def watch_plugins():
+    """Link and check plugin changes as they happen until interrupted."""
+    watcher = get_watcher(START_DIR, (".ini", ".py"), WATCH_POLL_INTERVAL)
+    print(
+        f'Watching "{START_DIR}" using {type(watcher).__name__}. '
+        f"Press Ctrl+C to stop.\n",
+    )
+    try:
+        for changes in watcher.iter_changes(WATCH_DEBOUNCE):
+            handle_changes(changes)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+# =============================================================================
+# >> FUNCTIONS
+# =============================================================================
+def handle_changes(paths):
+    """Link the new directories/.ini files and check the changed .py files."""
+    links = []
+    files = []
+    for path in sorted(map(Path, paths)):
+        parts = tuple(START_DIR.relpathto(path).splitall()[1:])
+        if len(parts) < 2 or parts[0] not in plugin_registry:  # noqa: PLR2004
+            continue
+
+        plugin_name = parts[0]
+        link = _get_link(plugin_name, parts, path)
+        if link is not None:
+            links.append(link)
+
+        # Was a file of the plugin's Python package changed?
+        if (
+            path.suffix == ".py" and
+            parts[1:len(_plugin_base_path_parts) + 2] == (
+                *_plugin_base_path_parts, plugin_name,
+            ) and
+            path.is_file()
+        ):
+            files.append(path)
+
+    if links:
+        print_link_results(apply_links(
+            plan_links(links, link_manifest), manifest=link_manifest,
+        ))
+
+    if files:
+        run(
+            ["ruff", "check", "--output-format=concise", *files],
+            cwd=START_DIR,
+            check=False,
+        )
+
+
+# =============================================================================
+# >> HELPER FUNCTIONS
+# =============================================================================
+def _get_link(plugin_name, parts, path):
+    """Return the (src, dest, kind) link for the path, if it needs one."""
+    base_path = _base_path_parts.get(parts[1:-1])
+    if base_path is None:
+        return None
+
+    dest = LINK_BASE_DIRECTORY / base_path / parts[-1]
+    if parts[-1] == plugin_name and path.is_dir():
+        return path, dest, "directory"
+
+    if parts[-1] == f"{plugin_name}.ini" and path.is_file():
+        return path, dest, "file"
+
+    return None
+
+
+# =============================================================================
+# >> CALL MAIN FUNCTION
+# =============================================================================
+if __name__ == "__main__":
+    clear_screen()
+    watch_plugins()
@@ -6,31 +6,114 @@
 # >> IMPORTS
 # =============================================================================
 # Package
-from common.constants import supported_games
-from common.functions import clear_screen, get_game, link_source_python
+from common.cli import (
+    add_names_argument,
+    finish_batch,
+    get_names,
+    get_parser,
+    parse_args,
+    run_batch,
+)
+from common.constants import LINK_WORKERS
+from common.functions import (
+    clear_screen,
+    get_game,
+    link_source_python,
+    prepare_bin_cache,
+    run_captured,
+)
+from common.profiling import add_events, call_profiled, is_enabled
+from common.servers import supported_games
 
 
 # =============================================================================
 # >> MAIN FUNCTION
 # =============================================================================
-def link_game(game_name):
-    """Link Source.Python's repository to the given game/server."""
+def link_game(game_name, bin_cache=None):
+    """Link Source.Python's repository to the given game/server.
+
+    Returns the link results, or None if the game name is invalid.
+    """
     # Was an invalid game name given?
     if game_name not in supported_games:
         print(f'Invalid game name "{game_name}".')
-        return
+        return None
 
     # Print a message about the linking
     print(f"Linking Source.Python to {game_name}.\n")
 
     # Link Source.Python to the game
-    link_source_python(game_name)
+    return link_source_python(game_name, bin_cache)
+
+
+def link_games(game_names):
+    """Link Source.Python to the given games/servers concurrently.
+
+    Returns the link results of each game, which are None for the games
+    whose worker failed.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    # Prepare the bin cache once, before the workers use it
+    bin_cache = prepare_bin_cache()
+
+    with ProcessPoolExecutor(max_workers=LINK_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                call_profiled, is_enabled(), run_captured, link_game,
+                game_name, bin_cache,
+            ): game_name
+            for game_name in game_names
+        }
+        results = {}
+        for future in as_completed(futures):
+            game_name = futures[future]
+            try:
+                (results[game_name], output), events = future.result()
+            except Exception as error:  # noqa: BLE001
+                results[game_name] = None
+                output = (
+                    f"Linking Source.Python to {game_name} failed: "
+                    f"{error!r}\n"
+                )
+            else:
+                add_events(events)
+            print(output)
+    return results
 
 
 # =============================================================================
 # >> CALL MAIN FUNCTION
 # =============================================================================
 if __name__ == "__main__":
+    _parser = get_parser(__doc__)
+    add_names_argument(_parser, "game", "The game(s)/server(s) to link.")
+    _args = parse_args(_parser)
+
+    # Was the linker run in batch mode?
+    if _args.games:
+        _results, _output = run_batch(
+            link_games,
+            get_names(_parser, _args.games, supported_games, "game"),
+            as_json=_args.json,
+        )
+        finish_batch(
+            {
+                "games": {
+                    _game_name: (
+                        None if _links is None
+                        else [_result.as_dict() for _result in _links]
+                    )
+                    for _game_name, _links in sorted(_results.items())
+                },
+            },
+            _output,
+            as_json=_args.json,
+            failed=any(
+                _links is None or any(_result.failed for _result in _links)
+                for _links in _results.values()
+            ),
+        )
 
     # Get the game to link
     _game_name = get_game()
@@ -44,11 +127,8 @@ if __name__ == "__main__":
         # Was ALL selected?
         if _game_name == "ALL":
 
-            # Loop through each game
-            for _game_name in supported_games:
-
-                # Link the game
-                link_game(_game_name)
+            # Link all games
+            link_games(list(supported_games))
 
         # Otherwise
         else: